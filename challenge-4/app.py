@@ -9,6 +9,7 @@ sys.path.append(os.path.join(current_dir, "src"))
 
 # Import the QA bot
 from aaoifi_qa_bot import AAOIFIQABot
+from metrics import serve_metrics
 
 # Load environment variables
 load_dotenv()
@@ -39,16 +40,27 @@ if "num_results" not in st.session_state:
     st.session_state.num_results = 5
 
 
-# Initialize QA bot
+# Initialize QA bot. Creating it is instant: the vector store and LLM client
+# are opened by a background warm-up while the page renders.
 @st.cache_resource
 def load_qa_bot():
-    return AAOIFIQABot()
+    qa_bot = AAOIFIQABot()
+    qa_bot.warm_up()
+    # Prometheus scrapes /metrics (and /metrics.json) when METRICS_PORT is set
+    if os.getenv("METRICS_PORT"):
+        serve_metrics(int(os.getenv("METRICS_PORT")))
+    return qa_bot
 
 
-# Display a loading spinner while initializing the bot
-with st.spinner("Loading AAOIFI QA Bot..."):
-    qa_bot = load_qa_bot()
-    st.success("QA Bot loaded successfully!")
+qa_bot = load_qa_bot()
+
+def render_sources(sources):
+    """Show retrieved sources in an expander"""
+    if sources:
+        with st.expander("Sources"):
+            for i, source in enumerate(sources):
+                st.markdown(f"**Source {i+1}**: {source}")
+
 
 # Display chat messages
 for message in st.session_state.messages:
@@ -60,19 +72,39 @@ for message in st.session_state.messages:
             and message["role"] == "assistant"
             and "sources" in message
         ):
-            with st.expander("Sources"):
-                for i, source in enumerate(message["sources"]):
-                    st.markdown(f"**Source {i+1}**: {source}")
+            render_sources(message["sources"])
 
 # User input
 user_query = st.chat_input("Ask a question about AAOIFI standards")
 
 # Update QA bot settings based on session state
-if hasattr(qa_bot, "llm") and hasattr(qa_bot.llm, "temperature"):
-    qa_bot.llm.temperature = st.session_state.temperature
+qa_bot.set_temperature(st.session_state.temperature)
+qa_bot.set_num_results(st.session_state.num_results)
+
+
+def respond(question):
+    """Answer a question and stream it into the assistant's chat message"""
+    with st.chat_message("assistant"):
+        with st.spinner("Searching the standards..."):
+            result = qa_bot.prepare_answer(question)
+
+        # Sources are known once retrieval finishes, before generation starts
+        if st.session_state.show_sources:
+            render_sources(result.sources)
+
+        # Render tokens as they arrive instead of waiting for the full answer
+        st.write_stream(qa_bot.stream_answer(result))
+
+        if st.session_state.show_sources:
+            # Store sources in message
+            st.session_state.messages.append(
+                {"role": "assistant", "content": result.answer, "sources": result.sources}
+            )
+        else:
+            st.session_state.messages.append(
+                {"role": "assistant", "content": result.answer}
+            )
 
-if hasattr(qa_bot, "retriever") and hasattr(qa_bot.retriever, "search_kwargs"):
-    qa_bot.retriever.search_kwargs["k"] = st.session_state.num_results
 
 # Handle user input
 if user_query:
@@ -84,38 +116,7 @@ if user_query:
         st.markdown(user_query)
 
     # Generate response
-    with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            response = qa_bot.answer_question(user_query)
-            st.markdown(response)
-
-            # Get and show sources if enabled
-            if st.session_state.show_sources:
-                sources = []
-                if hasattr(qa_bot, "retriever"):
-                    docs = qa_bot.retriever.invoke(user_query)
-                    sources = (
-                        [
-                            f"{doc.metadata.get('source', 'Unknown')} (Page {doc.metadata.get('page', 'Unknown')})"
-                            for doc in docs
-                        ]
-                        if docs
-                        else []
-                    )
-
-                if sources:
-                    with st.expander("Sources"):
-                        for i, source in enumerate(sources):
-                            st.markdown(f"**Source {i+1}**: {source}")
-
-                # Store sources in message
-                st.session_state.messages.append(
-                    {"role": "assistant", "content": response, "sources": sources}
-                )
-            else:
-                st.session_state.messages.append(
-                    {"role": "assistant", "content": response}
-                )
+    respond(user_query)
 
 # Sidebar with information and settings
 with st.sidebar:
@@ -153,42 +154,7 @@ with st.sidebar:
             with st.chat_message("user"):
                 st.markdown(question)
 
-            with st.chat_message("assistant"):
-                with st.spinner("Thinking..."):
-                    response = qa_bot.answer_question(question)
-                    st.markdown(response)
-
-                    # Get and show sources if enabled
-                    if st.session_state.show_sources:
-                        sources = []
-                        if hasattr(qa_bot, "retriever"):
-                            docs = qa_bot.retriever.invoke(question)
-                            sources = (
-                                [
-                                    f"{doc.metadata.get('source', 'Unknown')} (Page {doc.metadata.get('page', 'Unknown')})"
-                                    for doc in docs
-                                ]
-                                if docs
-                                else []
-                            )
-
-                        if sources:
-                            with st.expander("Sources"):
-                                for i, source in enumerate(sources):
-                                    st.markdown(f"**Source {i+1}**: {source}")
-
-                        # Store sources in message
-                        st.session_state.messages.append(
-                            {
-                                "role": "assistant",
-                                "content": response,
-                                "sources": sources,
-                            }
-                        )
-                    else:
-                        st.session_state.messages.append(
-                            {"role": "assistant", "content": response}
-                        )
+            respond(question)
 
             # Rerun to update UI
             st.rerun()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+import os
+import sys
+import json
+import asyncio
+import argparse
+
+# Add the src directory to the path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(current_dir, "src"))
+
+from aaoifi_qa_bot import AAOIFIQABot
+from metrics import get_metrics, enable_json_logs
+
+
+def read_questions(path):
+    """Read questions from a JSONL file.
+
+    Each line is either a JSON string or an object with a "question" field
+    and an optional "id".
+    """
+    questions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                record = {"question": record}
+            record.setdefault("id", line_number)
+            questions.append(record)
+    return questions
+
+
+async def main():
+    """Answer a JSONL file of questions and write the answers as JSONL"""
+    parser = argparse.ArgumentParser(
+        description="Answer AAOIFI questions in batch with concurrent LLM calls."
+    )
+    parser.add_argument("input", help="JSONL file with one question per line")
+    parser.add_argument("output", help="JSONL file to write answers to")
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=4,
+        help="Maximum number of LLM calls in flight",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=100,
+        help="Questions embedded and searched together; answers are written after each batch",
+    )
+    parser.add_argument("--num-results", type=int, default=5)
+    parser.add_argument("--temperature", type=float, default=0.2)
+    parser.add_argument(
+        "--metrics-json",
+        help="Write stage latencies (p50/p95/p99), token counts and cache hit rates to this file",
+    )
+    parser.add_argument(
+        "--log-json",
+        action="store_true",
+        help="Log one structured JSON event per question to stderr",
+    )
+    args = parser.parse_args()
+
+    if args.log_json:
+        enable_json_logs()
+
+    records = read_questions(args.input)
+    print(f"Loaded {len(records)} questions from {args.input}")
+
+    qa_bot = AAOIFIQABot(temperature=args.temperature, num_results=args.num_results)
+
+    with open(args.output, "w", encoding="utf-8") as out:
+        for start in range(0, len(records), args.batch_size):
+            batch = records[start : start + args.batch_size]
+            # One event loop for every batch: pooled async LLM clients stay bound to it
+            results = await qa_bot.aanswer_batch(
+                [record["question"] for record in batch],
+                max_concurrency=args.max_concurrency,
+            )
+            for record, result in zip(batch, results):
+                out.write(
+                    json.dumps(
+                        {
+                            "id": record["id"],
+                            "question": result.question,
+                            "answer": result.answer,
+                            "sources": result.sources,
+                            "scores": result.scores,
+                            "cached": result.cached,
+                            "timings": result.timings,
+                            "tokens": result.tokens,
+                        },
+                        ensure_ascii=False,
+                    )
+                    + "\n"
+                )
+            out.flush()
+            print(f"Answered {start + len(batch)}/{len(records)} questions")
+
+    if args.metrics_json:
+        with open(args.metrics_json, "w", encoding="utf-8") as f:
+            f.write(get_metrics().to_json())
+        print(f"Metrics written to {args.metrics_json}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,310 @@
+#!/usr/bin/env python
+"""End-to-end load benchmark for the QA bot and the batch pipelines.
+
+Runs every target against the local mock LLM server (mock_llm_server.py),
+so no API traffic is paid for, and sweeps the concurrency:
+
+    qa          AAOIFIQABot.answer() from concurrent threads, like app users
+    qa_batch    AAOIFIQABot.answer_batch(), the batch_qa.py path
+    ledger      prompt | llm with Runnable.batch(), like challenge-2's ledger pipeline
+    validation  prompt | llm.with_structured_output(ValidationReport), like
+                challenge-3's Validation Agent
+
+For each target and concurrency it reports throughput, output tokens/sec,
+p50/p95/p99 latency of successful requests (for qa_batch, from the moment
+a question gets an LLM slot), failed requests, and retry
+behaviour seen by the server: requests beyond one per call are retries
+(by the OpenAI client, or by acall_with_retry for qa_batch).
+
+    python benchmarks/load_benchmark.py
+    python benchmarks/load_benchmark.py --concurrency 1 8 32 --requests 64 --error-rate 0.05
+    python benchmarks/load_benchmark.py --targets qa ledger --capacity 8 --json load.json
+    python benchmarks/load_benchmark.py --base-url http://127.0.0.1:8011/v1
+
+Without --base-url a mock server is started in-process with the latency,
+token rate and error options below; with it, those options are ignored and
+the given OpenAI-compatible server is used as is.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(os.path.dirname(BENCHMARK_DIR))
+sys.path.append(os.path.join(os.path.dirname(BENCHMARK_DIR), "src"))
+sys.path.append(os.path.join(PROJECT_ROOT, "notebooks", "challenge-3"))
+
+from mock_llm_server import add_settings_arguments, serve, settings_from_args
+from aaoifi_qa_bot import AAOIFIQABot, DATA_DIR
+from embedding_backends import get_embeddings
+from embedding_cache import normalize_text
+from llm_pool import PoolSettings, configure_pool, get_llm, get_prompt
+from metrics import quantile
+
+QUESTIONS_PATH = os.path.join(BENCHMARK_DIR, "retrieval_questions.jsonl")
+
+TARGETS = ("qa", "qa_batch", "ledger", "validation")
+
+LEDGER_TEMPLATE = """You are an expert in Islamic finance and AAOIFI standards.
+Excerpts from potentially relevant standards:
+{context}
+
+Transaction: {question}
+
+Return the applicable FAS standards with probability weights, your reasoning,
+a compliance assessment and Shariah considerations as JSON."""
+
+VALIDATION_TEMPLATE = """You are validating proposed enhancements to AAOIFI standards.
+Proposed enhancements: {question}
+
+Additional context from Shariah standards:
+{context}
+
+Give a verdict, rationale and referenced clause for each enhancement."""
+
+
+def read_questions(path: str) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line)["question"] for line in f if line.strip()]
+
+
+def server_counters(base_url: str) -> Dict[str, float]:
+    """Flattened counters of the mock server, e.g. requests_total{endpoint=chat,status=200}"""
+    url = base_url.rstrip("/").rsplit("/v1", 1)[0] + "/metrics.json"
+    with urllib.request.urlopen(url) as response:
+        snapshot = json.load(response)
+    counters = {}
+    for name, series in snapshot["counters"].items():
+        for item in series:
+            labels = ",".join(f"{k}={v}" for k, v in sorted(item["labels"].items()))
+            counters[f"{name}{{{labels}}}"] = item["value"]
+    return counters
+
+
+def counter_delta(before: Dict[str, float], after: Dict[str, float], prefix: str) -> float:
+    return sum(
+        value - before.get(key, 0.0) for key, value in after.items() if key.startswith(prefix)
+    )
+
+
+def run_qa(bot: AAOIFIQABot, questions: List[str], concurrency: int):
+    """(latencies of successful answers, failures) for concurrent answer() calls"""
+
+    def ask(question):
+        start = time.perf_counter()
+        try:
+            error = bot.answer(question).error
+        except Exception as e:
+            error = str(e)
+        return time.perf_counter() - start, error
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(ask, questions))
+    return [seconds for seconds, error in outcomes if error is None], sum(
+        1 for _, error in outcomes if error is not None
+    )
+
+
+def run_qa_batch(bot: AAOIFIQABot, questions: List[str], concurrency: int):
+    """(latencies of successful answers, failures) for one answer_batch() call.
+
+    A question's latency runs from acquiring an LLM slot to its answer. The
+    batch's retrieval runs once for every question before that, and the
+    wait for a slot is the queued timing, so neither is counted.
+    """
+    results = bot.answer_batch(questions, max_concurrency=concurrency)
+    return (
+        [
+            result.timings.get("prompt", 0.0) + result.timings.get("generation", 0.0)
+            for result in results
+            if result.error is None
+        ],
+        sum(1 for result in results if result.error is not None),
+    )
+
+
+def run_chain(chain, inputs: List[Dict[str, str]], concurrency: int):
+    """Runnable.batch() with the pool's config, timing each input"""
+    from langchain_core.runnables import RunnableLambda
+    from llm_pool import get_pool
+
+    latencies = []
+
+    def timed(item):
+        start = time.perf_counter()
+        output = chain.invoke(item)
+        latencies.append(time.perf_counter() - start)
+        return output
+
+    outputs = RunnableLambda(timed).batch(
+        inputs, config=get_pool().run_config(max_concurrency=concurrency), return_exceptions=True
+    )
+    return latencies, sum(1 for output in outputs if isinstance(output, Exception))
+
+
+def run_level(target: str, runners, questions: List[str], concurrency: int, base_url: str):
+    before = server_counters(base_url)
+    start = time.perf_counter()
+    latencies, failures = runners[target](questions, concurrency)
+    elapsed = time.perf_counter() - start
+    after = server_counters(base_url)
+
+    latencies.sort()
+    chat_requests = counter_delta(before, after, "requests_total{endpoint=chat")
+    # answer_batch() generates repeated questions once
+    calls = len({normalize_text(q) for q in questions}) if target == "qa_batch" else len(questions)
+    return {
+        "target": target,
+        "concurrency": concurrency,
+        "requests": len(questions),
+        "failed": failures,
+        "seconds": elapsed,
+        "throughput": (len(questions) - failures) / elapsed,
+        "output_tokens_per_second": counter_delta(before, after, "tokens_total{kind=output}") / elapsed,
+        "latency_ms": {
+            f"p{int(q * 100)}": quantile(latencies, q) * 1000 for q in (0.5, 0.95, 0.99)
+        },
+        "server_requests": chat_requests,
+        "retries": max(0.0, chat_requests - calls),
+        "injected_errors": counter_delta(before, after, "injected_errors_total{endpoint=chat"),
+        "rejected": counter_delta(before, after, "rejected_total{endpoint=chat"),
+    }
+
+
+def print_results(results):
+    print(
+        f"\n{'target':<11} {'conc':>4} {'ok':>5} {'failed':>6} {'req/s':>7} {'tok/s':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'retries':>7} {'injected':>8} {'rejected':>8}"
+    )
+    for result in results:
+        latency = result["latency_ms"]
+        print(
+            f"{result['target']:<11} {result['concurrency']:>4} "
+            f"{result['requests'] - result['failed']:>5} {result['failed']:>6} "
+            f"{result['throughput']:>7.2f} {result['output_tokens_per_second']:>8.1f} "
+            f"{latency['p50']:>8.1f} {latency['p95']:>8.1f} {latency['p99']:>8.1f} "
+            f"{result['retries']:>7.0f} {result['injected_errors']:>8.0f} {result['rejected']:>8.0f}"
+        )
+
+
+def run_benchmark(args, base_url: str, work_dir: str) -> List[Dict[str, Any]]:
+    """Set up the bot and pipelines against the server and run every level"""
+    options = {"base_url": base_url, "api_key": "mock"}
+    questions = read_questions(args.questions)
+    questions = [questions[i % len(questions)] for i in range(args.requests)]
+    bot = AAOIFIQABot(
+        llm_provider="openai",
+        llm_model="mock",
+        llm_options=options,
+        embedding_backend="openai",
+        embedding_model="mock-embedding",
+        embeddings=get_embeddings(
+            "openai", "mock-embedding", cache=False, check_embedding_ctx_length=False, **options
+        ),
+        persist_directory=os.path.join(work_dir, "vector_db"),
+        data_dir=args.data_dir,
+        # Every request must reach the LLM
+        semantic_cache=False,
+    )
+    bot.warm_up(background=False)
+
+    llm = get_llm("openai", "mock", temperature=0, **options)
+    contexts = {
+        question: "\n\n".join(doc.page_content for doc in bot.retrieve(question)[0])
+        for question in set(questions)
+    }
+    inputs = [{"question": question, "context": contexts[question]} for question in questions]
+    ledger_chain = get_prompt(LEDGER_TEMPLATE, chat=True) | llm
+    runners = {
+        "qa": lambda batch, concurrency: run_qa(bot, batch, concurrency),
+        "qa_batch": lambda batch, concurrency: run_qa_batch(bot, batch, concurrency),
+        "ledger": lambda batch, concurrency: run_chain(ledger_chain, inputs, concurrency),
+    }
+    if "validation" in args.targets:
+        from validation_schema import ValidationReport
+
+        validation_chain = get_prompt(VALIDATION_TEMPLATE, chat=True) | llm.with_structured_output(
+            ValidationReport
+        )
+        runners["validation"] = lambda batch, concurrency: run_chain(
+            validation_chain, inputs, concurrency
+        )
+
+    results = []
+    for target in args.targets:
+        for concurrency in args.concurrency:
+            print(f"Running {target} at concurrency {concurrency}...", file=sys.stderr)
+            results.append(run_level(target, runners, questions, concurrency, base_url))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--targets", nargs="+", default=list(TARGETS), choices=TARGETS)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=32, help="Requests per target and concurrency")
+    parser.add_argument("--max-retries", type=int, default=PoolSettings.max_retries,
+                        help="Retries of the OpenAI client per call")
+    parser.add_argument("--base-url", help="Use this OpenAI-compatible server instead of an in-process mock")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--questions", default=QUESTIONS_PATH)
+    parser.add_argument(
+        "--work-dir",
+        help="Keep the vector store here and reuse it on the next run (default: temporary)",
+    )
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Show the bot's progress output")
+    add_settings_arguments(parser.add_argument_group("mock server"))
+    args = parser.parse_args()
+
+    settings = settings_from_args(args)
+    server = None
+    if args.base_url:
+        base_url = args.base_url
+    else:
+        server = serve(settings)
+        base_url = server.base_url
+        print(f"Mock LLM server on {base_url}")
+
+    # Connections are sized for the highest concurrency, like a deployment would be
+    connections = max(PoolSettings.max_connections, max(args.concurrency))
+    configure_pool(PoolSettings(
+        max_connections=connections,
+        max_keepalive_connections=connections,
+        max_retries=args.max_retries,
+    ))
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="load_benchmark_")
+    try:
+        if args.verbose:
+            results = run_benchmark(args, base_url, work_dir)
+        else:
+            # The bot prints progress for every question; keep the report readable
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                results = run_benchmark(args, base_url, work_dir)
+    finally:
+        if server is not None:
+            server.shutdown()
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_results(results)
+    if args.json:
+        report = {
+            "server": base_url if args.base_url else vars(settings),
+            "max_retries": args.max_retries,
+            "results": results,
+        }
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
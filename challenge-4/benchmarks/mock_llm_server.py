@@ -0,0 +1,421 @@
+#!/usr/bin/env python
+"""Local OpenAI-compatible stand-in for load tests.
+
+Serves /v1/chat/completions (plain, streamed, JSON schema and tool calls),
+/v1/completions and /v1/embeddings without calling any provider. Every
+response waits for a configurable latency (plus an exponential tail) and
+then emits output tokens at a fixed rate; a share of requests can fail with
+an injected error, and requests beyond a capacity limit are rejected with
+429 like a rate-limited provider. Embeddings come from the deterministic
+hashing embedder, so retrieval still finds the right standards.
+
+    python benchmarks/mock_llm_server.py --port 8011 --latency 0.3 --error-rate 0.05
+
+Point a client at it with base_url="http://127.0.0.1:8011/v1" and any API
+key, e.g. get_llm("openai", "mock", base_url=..., api_key="mock"). Request,
+error and token counters are served at /metrics and /metrics.json.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from dataclasses import dataclass, fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(BENCHMARK_DIR), "src"))
+
+from embedding_backends import HashingEmbeddings
+from metrics import MetricsRegistry, estimate_tokens
+
+
+@dataclass
+class MockSettings:
+    """Simulated provider behaviour.
+
+    latency is the time to the first token; each request adds an exponential
+    tail with mean jitter. Output tokens then arrive at tokens_per_second.
+    error_rate of the chat and completion requests fail with error_status;
+    with capacity > 0, requests beyond that many in flight are rejected with
+    429.
+    """
+
+    latency: float = 0.2
+    jitter: float = 0.05
+    tokens_per_second: float = 100.0
+    output_tokens: int = 64
+    error_rate: float = 0.0
+    error_status: int = 503
+    capacity: int = 0
+    embedding_latency: float = 0.01
+    embedding_dimensions: int = 1024
+    seed: Optional[int] = None
+
+MOCK_METRICS = {
+    "requests_total": "Requests served, by endpoint and HTTP status",
+    "injected_errors_total": "Requests failed on purpose (--error-rate)",
+    "rejected_total": "Requests rejected with 429 because capacity was reached",
+    "tokens_total": "Input, output and embedding tokens",
+    "in_flight": "Requests being served",
+    "request_seconds": "Seconds per request, including injected latency",
+}
+
+
+def sample_json(schema: Dict[str, Any], definitions: Dict[str, Any] = None, depth: int = 0) -> Any:
+    """Smallest plausible instance of a JSON schema, for structured output"""
+    definitions = definitions if definitions is not None else schema.get("$defs", {})
+    if "$ref" in schema:
+        return sample_json(definitions[schema["$ref"].rsplit("/", 1)[1]], definitions, depth)
+    if "const" in schema:
+        return schema["const"]
+    if "enum" in schema:
+        return schema["enum"][0]
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            options = [option for option in schema[key] if option.get("type") != "null"]
+            return sample_json(options[0] if options else {}, definitions, depth)
+
+    schema_type = schema.get("type", "string")
+    if isinstance(schema_type, list):
+        schema_type = next((t for t in schema_type if t != "null"), "string")
+    if schema_type == "object":
+        return {
+            name: sample_json(prop, definitions, depth + 1)
+            for name, prop in schema.get("properties", {}).items()
+        }
+    if schema_type == "array":
+        count = 0 if depth > 3 else max(2, schema.get("minItems", 0))
+        return [sample_json(schema.get("items", {}), definitions, depth + 1) for _ in range(count)]
+    if schema_type in ("integer", "number"):
+        return schema.get("minimum", 1)
+    if schema_type == "boolean":
+        return True
+    return "mock"
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, address, settings: MockSettings):
+        super().__init__(address, MockHandler)
+        self.settings = settings
+        self.random = random.Random(settings.seed)
+        self.embedder = HashingEmbeddings(settings.embedding_dimensions)
+        self.metrics = MetricsRegistry(namespace="mock_llm")
+        for name, description in MOCK_METRICS.items():
+            self.metrics.describe(name, description)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def admit(self) -> bool:
+        """Take a slot for a request, False when over capacity"""
+        with self._lock:
+            if self.settings.capacity and self._in_flight >= self.settings.capacity:
+                return False
+            self._in_flight += 1
+            self.metrics.set_gauge("in_flight", self._in_flight)
+            return True
+
+    def release(self):
+        with self._lock:
+            self._in_flight -= 1
+            self.metrics.set_gauge("in_flight", self._in_flight)
+
+    def draw(self):
+        """(fail, extra latency) for one request"""
+        with self._lock:
+            fail = self.random.random() < self.settings.error_rate
+            tail = self.random.expovariate(1 / self.settings.jitter) if self.settings.jitter else 0.0
+        return fail, tail
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: MockLLMServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status: int, payload: Dict[str, Any], headers: Dict[str, str] = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status: int, message: str):
+        error_type = {429: "rate_limit_error", 400: "invalid_request_error"}.get(status, "server_error")
+        headers = {"Retry-After": "1"} if status == 429 else None
+        self.send_json(status, {"error": {"message": message, "type": error_type}}, headers)
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            body = self.server.metrics.to_prometheus().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/metrics.json":
+            body = self.server.metrics.to_json().encode("utf-8")
+            content_type = "application/json"
+        elif path == "/v1/models":
+            body = json.dumps({"object": "list", "data": [{"id": "mock", "object": "model"}]}).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error_json(404, f"Unknown path {path}")
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        endpoints = {
+            "/v1/chat/completions": ("chat", self.chat_completion),
+            "/v1/completions": ("completion", self.completion),
+            "/v1/embeddings": ("embedding", self.embedding),
+        }
+        path = self.path.split("?", 1)[0]
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if path not in endpoints:
+            self.send_error_json(404, f"Unknown path {path}")
+            return
+        endpoint, handle = endpoints[path]
+        metrics = self.server.metrics
+        start = time.perf_counter()
+
+        if not self.server.admit():
+            metrics.inc("requests_total", endpoint=endpoint, status="429")
+            metrics.inc("rejected_total", endpoint=endpoint)
+            self.send_error_json(429, "Rate limit reached: too many requests in flight")
+            return
+        try:
+            fail, tail = self.server.draw()
+            if fail and endpoint != "embedding":
+                time.sleep(tail)
+                status = self.server.settings.error_status
+                metrics.inc("requests_total", endpoint=endpoint, status=str(status))
+                metrics.inc("injected_errors_total", endpoint=endpoint)
+                self.send_error_json(status, "Injected failure from the mock server")
+                return
+            try:
+                handle(request, tail)
+            except (KeyError, ValueError) as e:
+                metrics.inc("requests_total", endpoint=endpoint, status="400")
+                self.send_error_json(400, str(e))
+                return
+            metrics.inc("requests_total", endpoint=endpoint, status="200")
+        finally:
+            self.server.release()
+            metrics.observe("request_seconds", time.perf_counter() - start, endpoint=endpoint)
+
+    def generate(self, request: Dict[str, Any]):
+        """(text, tool call, output tokens) for a chat or completion request"""
+        settings = self.server.settings
+        tools = request.get("tools") or []
+        if tools and request.get("tool_choice") != "none":
+            function = tools[0]["function"]
+            choice = request.get("tool_choice")
+            if isinstance(choice, dict):
+                name = choice["function"]["name"]
+                function = next(tool["function"] for tool in tools if tool["function"]["name"] == name)
+            arguments = json.dumps(sample_json(function.get("parameters", {})))
+            return "", {"name": function["name"], "arguments": arguments}, estimate_tokens(arguments)
+
+        response_format = request.get("response_format") or {}
+        if response_format.get("type") in ("json_schema", "json_object"):
+            schema = (response_format.get("json_schema") or {}).get("schema", {"type": "object"})
+            text = json.dumps(sample_json(schema))
+            return text, None, estimate_tokens(text)
+
+        max_tokens = request.get("max_completion_tokens") or request.get("max_tokens")
+        count = min(settings.output_tokens, max_tokens or settings.output_tokens)
+        # One word per token, so streamed chunks match the token rate
+        return " ".join(f"token{i}" for i in range(count)), None, count
+
+    def usage(self, prompt: str, completion_tokens: int) -> Dict[str, int]:
+        prompt_tokens = estimate_tokens(prompt)
+        self.server.metrics.inc("tokens_total", prompt_tokens, kind="input")
+        self.server.metrics.inc("tokens_total", completion_tokens, kind="output")
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    def chat_completion(self, request: Dict[str, Any], tail: float):
+        settings = self.server.settings
+        prompt = "\n".join(
+            message["content"] if isinstance(message.get("content"), str) else json.dumps(message.get("content"))
+            for message in request.get("messages", [])
+        )
+        text, tool_call, output_tokens = self.generate(request)
+        usage = self.usage(prompt, output_tokens)
+        time.sleep(settings.latency + tail)
+
+        if request.get("stream"):
+            self.stream_chat(request, text, usage)
+            return
+
+        time.sleep(usage["completion_tokens"] / settings.tokens_per_second)
+        message = {"role": "assistant", "content": text or None}
+        if tool_call:
+            message["tool_calls"] = [{"id": "call_mock", "type": "function", "function": tool_call}]
+        self.send_json(200, {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if tool_call else "stop",
+            }],
+            "usage": usage,
+        })
+
+    def stream_chat(self, request: Dict[str, Any], text: str, usage: Dict[str, int]):
+        """Server-sent events, one chunk per token at the configured rate"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def event(payload):
+            data = f"data: {payload}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        def chunk(delta, finish_reason=None, **extra):
+            return json.dumps({
+                "id": "chatcmpl-mock",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "mock"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                **extra,
+            })
+
+        interval = 1 / self.server.settings.tokens_per_second
+        event(chunk({"role": "assistant", "content": ""}))
+        pieces = text.split(" ")
+        for i, piece in enumerate(pieces):
+            event(chunk({"content": piece if i == 0 else " " + piece}))
+            time.sleep(interval)
+        event(chunk({}, "stop"))
+        if (request.get("stream_options") or {}).get("include_usage"):
+            event(json.dumps({
+                "id": "chatcmpl-mock",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "mock"),
+                "choices": [],
+                "usage": usage,
+            }))
+        event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def completion(self, request: Dict[str, Any], tail: float):
+        settings = self.server.settings
+        prompt = request.get("prompt", "")
+        prompt = "\n".join(prompt) if isinstance(prompt, list) else prompt
+        text, _, output_tokens = self.generate(request)
+        usage = self.usage(prompt, output_tokens)
+        time.sleep(settings.latency + tail + usage["completion_tokens"] / settings.tokens_per_second)
+        self.send_json(200, {
+            "id": "cmpl-mock",
+            "object": "text_completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{"index": 0, "text": text, "finish_reason": "stop", "logprobs": None}],
+            "usage": usage,
+        })
+
+    def embedding(self, request: Dict[str, Any], tail: float):
+        inputs = request.get("input", [])
+        inputs = [inputs] if isinstance(inputs, str) else inputs
+        if inputs and not isinstance(inputs[0], str):
+            raise ValueError("Token id inputs are not supported; pass check_embedding_ctx_length=False")
+        vectors = self.server.embedder.embed_documents(inputs)
+        prompt_tokens = sum(estimate_tokens(text) for text in inputs)
+        self.server.metrics.inc("tokens_total", prompt_tokens, kind="embedding")
+        time.sleep(self.server.settings.embedding_latency + tail)
+        self.send_json(200, {
+            "object": "list",
+            "model": request.get("model", "mock"),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": vector}
+                for i, vector in enumerate(vectors)
+            ],
+            "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+        })
+
+
+def serve(settings: Optional[MockSettings] = None, port: int = 0, host: str = "127.0.0.1") -> MockLLMServer:
+    """Start the mock server in a daemon thread (port 0 picks a free port)"""
+    server = MockLLMServer((host, port), settings or MockSettings())
+    threading.Thread(target=server.serve_forever, name="mock-llm-server", daemon=True).start()
+    return server
+
+
+def add_settings_arguments(parser: argparse.ArgumentParser):
+    """Command line options for every MockSettings field"""
+    help_texts = {
+        "latency": "Seconds to the first token",
+        "jitter": "Mean of the exponential latency tail in seconds (0 for none)",
+        "tokens_per_second": "Output token rate",
+        "output_tokens": "Tokens per text response",
+        "error_rate": "Share of chat and completion requests failing with --error-status",
+        "error_status": "HTTP status of injected failures (e.g. 429, 500, 503)",
+        "capacity": "Reject requests beyond this many in flight with 429 (0: unlimited)",
+        "embedding_latency": "Seconds per embedding request",
+        "embedding_dimensions": "Embedding vector size",
+        "seed": "Random seed for latency and error draws",
+    }
+    defaults = MockSettings()
+    for field in fields(MockSettings):
+        parser.add_argument(
+            f"--{field.name.replace('_', '-')}",
+            type=float if field.type is float else int,
+            default=getattr(defaults, field.name),
+            help=help_texts[field.name],
+        )
+
+
+def settings_from_args(args) -> MockSettings:
+    return MockSettings(**{field.name: getattr(args, field.name) for field in fields(MockSettings)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8011)
+    add_settings_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockLLMServer((args.host, args.port), settings_from_args(args))
+    print(f"Mock LLM server listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+"""Offline retrieval benchmark and regression check for the AAOIFI QA bot.
+
+Builds the vector store and BM25 index from data/*.pdf with the
+deterministic hashing embedder (no API key or model download), runs the
+labelled questions in retrieval_questions.jsonl through AAOIFIQABot.retrieve()
+for every configuration (chunk size x k x retrieval mode), and reports
+queries/sec, latency percentiles, recall@k and MRR.
+
+A question's relevant standards are labelled ("FAS 32", "SS 9"); a retrieved
+chunk is relevant when its standard metadata matches one of them. recall@k is
+the share of a question's standards found in its top k chunks, and MRR uses
+the rank of the first relevant chunk.
+
+    python benchmarks/retrieval_benchmark.py                     # compare with the baseline
+    python benchmarks/retrieval_benchmark.py --update-baseline   # accept the current results
+    python benchmarks/retrieval_benchmark.py --chunk-sizes 1000 --k 5 --modes hybrid
+
+Exit code 1 when recall@k or MRR of any configuration drops below the
+baseline by more than --tolerance. Latency depends on the machine, so it is
+only checked when --latency-tolerance is given.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+from typing import List, Dict, Any
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(BENCHMARK_DIR), "src"))
+
+from aaoifi_qa_bot import AAOIFIQABot, DATA_DIR, RETRIEVAL_MODES
+from embedding_backends import DEFAULT_MODELS, get_embeddings
+from metrics import quantile
+from standard_refs import metadata_standards
+
+QUESTIONS_PATH = os.path.join(BENCHMARK_DIR, "retrieval_questions.jsonl")
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, "baselines", "retrieval.json")
+
+EMBEDDING_BACKEND = "hashing"
+
+
+def read_questions(path: str) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def fingerprint(paths: List[str]) -> str:
+    """Short content hash of files, to tell when a baseline's inputs changed"""
+    digest = hashlib.sha1()
+    for path in sorted(paths):
+        digest.update(os.path.basename(path).encode("utf-8"))
+        with open(path, "rb") as f:
+            digest.update(hashlib.sha1(f.read()).digest())
+    return digest.hexdigest()[:16]
+
+
+def corpus_files(data_dir: str) -> List[str]:
+    return [
+        os.path.join(data_dir, name)
+        for name in os.listdir(data_dir)
+        if name.lower().endswith(".pdf")
+    ]
+
+
+def document_standards(doc) -> List[str]:
+    """Standards a chunk belongs to, e.g. ["FAS 10", "SS 11"] for a combined file"""
+    return [f"{kind} {number}" for kind, number in metadata_standards(doc.metadata)]
+
+
+def score_question(documents, relevant: List[str]) -> Dict[str, float]:
+    """recall@k and reciprocal rank of one question's retrieved chunks"""
+    standards = [document_standards(doc) for doc in documents]
+    found = {standard for chunk in standards for standard in chunk}.intersection(relevant)
+    first = next(
+        (rank for rank, chunk in enumerate(standards, 1) if set(chunk).intersection(relevant)),
+        None,
+    )
+    return {
+        "recall": len(found) / len(relevant),
+        "reciprocal_rank": 1.0 / first if first else 0.0,
+    }
+
+
+def run_config(bot: AAOIFIQABot, questions, k: int) -> Dict[str, Any]:
+    """Retrieve every question once and aggregate speed and quality"""
+    bot.set_num_results(k)
+    latencies, scores = [], []
+    started = time.perf_counter()
+    for item in questions:
+        start = time.perf_counter()
+        documents, _ = bot.retrieve(item["question"])
+        latencies.append(time.perf_counter() - start)
+        scores.append(score_question(documents, item["relevant"]))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "recall_at_k": sum(score["recall"] for score in scores) / len(scores),
+        "mrr": sum(score["reciprocal_rank"] for score in scores) / len(scores),
+        "qps": len(questions) / elapsed,
+        "latency_ms": {
+            f"p{int(q * 100)}": quantile(latencies, q) * 1000 for q in (0.5, 0.95, 0.99)
+        },
+    }
+
+
+def run_benchmark(args) -> Dict[str, Any]:
+    questions = read_questions(args.questions)
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="retrieval_benchmark_")
+    embeddings = get_embeddings(EMBEDDING_BACKEND, cache=False)
+
+    report = {
+        "embedder": DEFAULT_MODELS[EMBEDDING_BACKEND],
+        "corpus": fingerprint(corpus_files(args.data_dir)),
+        "questions": fingerprint([args.questions]),
+        "question_count": len(questions),
+        "index_build_seconds": {},
+        "configs": {},
+    }
+    try:
+        for chunk_size in args.chunk_sizes:
+            store_dir = os.path.join(work_dir, f"chunks_{chunk_size}")
+            for mode in args.modes:
+                bot = AAOIFIQABot(
+                    embedding_backend=EMBEDDING_BACKEND,
+                    embeddings=embeddings,
+                    persist_directory=store_dir,
+                    data_dir=args.data_dir,
+                    chunk_size=chunk_size,
+                    chunk_overlap=chunk_size // 5,
+                    retrieval_mode=mode,
+                    semantic_cache=False,
+                )
+                # Open the store (building it on first use) and the BM25
+                # index outside the timed runs; no LLM client is needed
+                start = time.perf_counter()
+                bot.vectorstore
+                if mode != "vector":
+                    bot.bm25_index
+                report["index_build_seconds"].setdefault(chunk_size, time.perf_counter() - start)
+                bot.retrieve(questions[0]["question"])
+
+                for k in args.k:
+                    name = f"chunk{chunk_size}_k{k}_{mode}"
+                    report["configs"][name] = {
+                        "chunk_size": chunk_size,
+                        "k": k,
+                        "mode": mode,
+                        **run_config(bot, questions, k),
+                    }
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return report
+
+
+def compare(report, baseline, tolerance: float, latency_tolerance=None) -> List[str]:
+    """Regressions of the report against a baseline, as messages"""
+    failures = []
+    for key in ("embedder", "corpus", "questions"):
+        if baseline.get(key) != report.get(key):
+            failures.append(
+                f"baseline was recorded with a different {key}; "
+                "review the results and rerun with --update-baseline"
+            )
+    if failures:
+        return failures
+
+    for name, expected in baseline["configs"].items():
+        actual = report["configs"].get(name)
+        if actual is None:
+            continue
+        for metric in ("recall_at_k", "mrr"):
+            if actual[metric] < expected[metric] - tolerance:
+                failures.append(
+                    f"{name}: {metric} {actual[metric]:.3f} < baseline {expected[metric]:.3f}"
+                )
+        if latency_tolerance is not None:
+            limit = expected["latency_ms"]["p95"] * (1 + latency_tolerance)
+            if actual["latency_ms"]["p95"] > limit:
+                failures.append(
+                    f"{name}: p95 latency {actual['latency_ms']['p95']:.1f}ms > {limit:.1f}ms"
+                )
+    return failures
+
+
+def print_report(report):
+    print(f"\n{report['question_count']} questions, embedder {report['embedder']}")
+    print(f"{'config':<28} {'recall@k':>8} {'MRR':>6} {'qps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, result in report["configs"].items():
+        latency = result["latency_ms"]
+        print(
+            f"{name:<28} {result['recall_at_k']:>8.3f} {result['mrr']:>6.3f} {result['qps']:>8.1f} "
+            f"{latency['p50']:>8.2f} {latency['p95']:>8.2f} {latency['p99']:>8.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[500, 1000])
+    parser.add_argument("--k", type=int, nargs="+", default=[5, 10])
+    parser.add_argument("--modes", nargs="+", default=list(RETRIEVAL_MODES), choices=RETRIEVAL_MODES)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--questions", default=QUESTIONS_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--output", help="Also write this run's results to a JSON file")
+    parser.add_argument(
+        "--work-dir",
+        help="Keep the built indexes here and reuse them on the next run (default: temporary)",
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.01,
+        help="Allowed absolute drop in recall@k and MRR",
+    )
+    parser.add_argument(
+        "--latency-tolerance", type=float,
+        help="Allowed relative increase of p95 latency (e.g. 0.5 for +50%%); unchecked by default",
+    )
+    parser.add_argument(
+        "--update-baseline", action="store_true",
+        help="Save the results as the new baseline instead of comparing",
+    )
+    args = parser.parse_args()
+
+    report = run_benchmark(args)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to create one")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    failures = compare(report, baseline, args.tolerance, args.latency_tolerance)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("\nOK: no retrieval regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
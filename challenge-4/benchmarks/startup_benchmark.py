@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+"""Cold-start benchmark for the AAOIFI QA bot.
+
+Each run starts a fresh Python process that imports aaoifi_qa_bot and creates
+an AAOIFIQABot, so nothing is warm from a previous run. The benchmark fails
+(exit code 1) when the median import or construction time exceeds its budget,
+or when importing the bot pulls in a heavy dependency that should only load
+on first use.
+
+    python benchmarks/startup_benchmark.py
+    python benchmarks/startup_benchmark.py --runs 10 --json startup.json
+    python benchmarks/startup_benchmark.py --open   # also time opening the vector store
+
+Runs without GOOGLE_API_KEY unless --open is given, since neither importing
+the module nor creating the bot may need it.
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCHMARK_DIR), "src")
+
+# Modules that must not be imported until the bot is first used
+HEAVY_MODULES = (
+    "chromadb",
+    "langchain_chroma",
+    "langchain_google_genai",
+    "langchain_openai",
+    "langchain_text_splitters",
+    "langchain_core",
+    "sentence_transformers",
+    "pypdf",
+    "numpy",
+)
+
+CHILD = """
+import sys
+import json
+import time
+
+start = time.perf_counter()
+import aaoifi_qa_bot
+imported = time.perf_counter()
+bot = aaoifi_qa_bot.AAOIFIQABot()
+created = time.perf_counter()
+loaded = [name for name in {heavy!r} if name in sys.modules]
+
+opened = None
+if {open_store!r}:
+    bot.vectorstore
+    opened = time.perf_counter() - created
+
+print(json.dumps({{
+    "import": imported - start,
+    "init": created - imported,
+    "open": opened,
+    "heavy_modules": loaded,
+}}))
+"""
+
+
+def run_once(open_store: bool) -> dict:
+    """Time one cold start in a fresh interpreter"""
+    env = dict(os.environ)
+    if not open_store:
+        env.pop("GOOGLE_API_KEY", None)
+    code = CHILD.format(heavy=HEAVY_MODULES, open_store=open_store)
+    completed = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=SRC_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Benchmark process failed:\n{completed.stderr}")
+    # The bot prints progress messages; the measurements are the last line
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def summarize(values):
+    return {
+        "median": statistics.median(values),
+        "min": min(values),
+        "max": max(values),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes to time")
+    parser.add_argument(
+        "--max-import", type=float, default=0.25,
+        help="Budget in seconds for the median import time",
+    )
+    parser.add_argument(
+        "--max-init", type=float, default=0.05,
+        help="Budget in seconds for the median AAOIFIQABot() time",
+    )
+    parser.add_argument(
+        "--open", action="store_true",
+        help="Also time opening the vector store (needs the store and API key)",
+    )
+    parser.add_argument("--json", help="Write the measurements to this JSON file")
+    args = parser.parse_args()
+
+    runs = [run_once(args.open) for _ in range(args.runs)]
+    report = {
+        "runs": args.runs,
+        "import": summarize([run["import"] for run in runs]),
+        "init": summarize([run["init"] for run in runs]),
+        "heavy_modules": sorted({name for run in runs for name in run["heavy_modules"]}),
+    }
+    if args.open:
+        report["open"] = summarize([run["open"] for run in runs])
+
+    for stage in ("import", "init", "open"):
+        if stage in report:
+            stats = report[stage]
+            print(
+                f"{stage:>6}: median {stats['median'] * 1000:8.1f} ms  "
+                f"(min {stats['min'] * 1000:.1f}, max {stats['max'] * 1000:.1f})"
+            )
+
+    failures = []
+    if report["import"]["median"] > args.max_import:
+        failures.append(f"import took {report['import']['median']:.3f}s (budget {args.max_import}s)")
+    if report["init"]["median"] > args.max_init:
+        failures.append(f"AAOIFIQABot() took {report['init']['median']:.3f}s (budget {args.max_init}s)")
+    if report["heavy_modules"]:
+        failures.append(f"heavy modules loaded at startup: {', '.join(report['heavy_modules'])}")
+    report["failures"] = failures
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK: startup within budget")
+
+
+if __name__ == "__main__":
+    main()
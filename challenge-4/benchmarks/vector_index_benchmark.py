@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+"""Memory and recall of the vector indexes: Chroma's HNSW against int8.
+
+Builds the store from data/*.pdf with the deterministic hashing embedder
+(see retrieval_benchmark.py), then runs the labelled questions through
+AAOIFIQABot.retrieve() in vector mode once per vector index, each in a
+fresh process that opens an already built store, like a serving replica.
+
+For each index it reports:
+    memory      growth of resident (Rss) and private anonymous memory from
+                after the imports to after the queries, from
+                /proc/self/smaps_rollup. Memory-mapped index files are not
+                anonymous: replicas on one node share them in the page cache.
+    recall@k    overlap of the top k chunks with an exact float32 search
+                over every stored embedding
+    latency     p50/p95 of retrieve()
+
+    python benchmarks/vector_index_benchmark.py
+    python benchmarks/vector_index_benchmark.py --chunk-size 1000 --k 5 --work-dir /tmp/vi
+
+Exit code 1 when int8 recall@k is below --min-recall, or when int8 does not
+use at most --max-memory-ratio of Chroma's anonymous memory.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+import subprocess
+from typing import List, Dict, Any
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(BENCHMARK_DIR), "src"))
+
+from aaoifi_qa_bot import AAOIFIQABot, DATA_DIR, VECTOR_INDEXES
+from embedding_backends import get_embeddings
+from metrics import quantile
+
+QUESTIONS_PATH = os.path.join(BENCHMARK_DIR, "retrieval_questions.jsonl")
+
+EMBEDDING_BACKEND = "hashing"
+
+
+def read_questions(path: str) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line)["question"] for line in f if line.strip()]
+
+
+def memory_mb() -> Dict[str, float]:
+    """Resident and anonymous memory of this process in MB"""
+    usage = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Anonymous:"):
+                usage[parts[0].rstrip(":").lower()] = int(parts[1]) / 1024
+    return usage
+
+
+def open_bot(store_dir: str, args, vector_index: str) -> AAOIFIQABot:
+    return AAOIFIQABot(
+        embedding_backend=EMBEDDING_BACKEND,
+        embeddings=get_embeddings(EMBEDDING_BACKEND, cache=False),
+        persist_directory=store_dir,
+        data_dir=args.data_dir,
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_size // 5,
+        retrieval_mode="vector",
+        vector_index=vector_index,
+        num_results=args.k,
+        auto_detect_standards=False,
+        semantic_cache=False,
+    )
+
+
+def run_worker(args):
+    """Measure one vector index; prints the result as JSON"""
+    questions = read_questions(args.questions)
+    # The bot imports these lazily; both indexes need them, so they are
+    # loaded before the baseline and only index memory is compared
+    import langchain_chroma, ingestion, quantized_store  # noqa: F401
+
+    before = memory_mb()
+    with contextlib.redirect_stdout(sys.stderr):
+        bot = open_bot(args.store_dir, args, args.worker)
+        start = time.perf_counter()
+        bot.vectorstore
+        open_seconds = time.perf_counter() - start
+
+        latencies, retrieved = [], []
+        for question in questions:
+            start = time.perf_counter()
+            documents, _ = bot.retrieve(question)
+            latencies.append(time.perf_counter() - start)
+            retrieved.append([doc.id for doc in documents])
+    after = memory_mb()
+
+    latencies.sort()
+    print(json.dumps({
+        "open_seconds": open_seconds,
+        "memory_mb": {key: after[key] - before[key] for key in before},
+        "latency_ms": {f"p{int(q * 100)}": quantile(latencies, q) * 1000 for q in (0.5, 0.95)},
+        "retrieved": retrieved,
+    }))
+
+
+def exact_neighbours(store_dir: str, args, questions: List[str]) -> List[set]:
+    """Top k chunk ids of each question by exact float32 search"""
+    import numpy as np
+    from quantized_store import collection_space, _distances
+
+    bot = open_bot(store_dir, args, "chroma")
+    collection = bot.vectorstore._collection
+    stored = collection.get(include=["embeddings"])
+    vectors = np.asarray(stored["embeddings"], dtype=np.float32)
+    ids = np.asarray(stored["ids"])
+    queries = np.asarray(bot.embeddings.embed_documents(questions), dtype=np.float32)
+    distances = _distances(
+        queries @ vectors.T,
+        np.linalg.norm(queries, axis=1),
+        np.linalg.norm(vectors, axis=1),
+        collection_space(collection),
+    )
+    return [set(ids[np.argsort(row, kind="stable")[:args.k]]) for row in distances]
+
+
+def run_benchmark(args) -> Dict[str, Any]:
+    questions = read_questions(args.questions)
+    store_dir = os.path.join(args.work_dir, f"chunks_{args.chunk_size}")
+
+    # Build the store and every saved index first, so the workers only open them
+    print("Building indexes...", file=sys.stderr)
+    with contextlib.redirect_stdout(sys.stderr):
+        for vector_index in VECTOR_INDEXES:
+            open_bot(store_dir, args, vector_index).vectorstore
+        truth = exact_neighbours(store_dir, args, questions)
+
+    report = {"chunk_size": args.chunk_size, "k": args.k, "questions": len(questions), "indexes": {}}
+    for vector_index in VECTOR_INDEXES:
+        print(f"Measuring {vector_index}...", file=sys.stderr)
+        command = [
+            sys.executable, os.path.abspath(__file__),
+            "--worker", vector_index,
+            "--store-dir", store_dir,
+            "--chunk-size", str(args.chunk_size),
+            "--k", str(args.k),
+            "--data-dir", args.data_dir,
+            "--questions", args.questions,
+        ]
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        result = json.loads(output)
+        retrieved = result.pop("retrieved")
+        result["recall_at_k"] = sum(
+            len(expected.intersection(ids)) / args.k for expected, ids in zip(truth, retrieved)
+        ) / len(questions)
+        report["indexes"][vector_index] = result
+    return report
+
+
+def print_report(report):
+    print(f"\n{report['questions']} questions, chunk size {report['chunk_size']}, k {report['k']}")
+    print(f"{'index':<8} {'recall@k':>8} {'rss MB':>8} {'anon MB':>8} {'open s':>7} {'p50 ms':>7} {'p95 ms':>7}")
+    for name, result in report["indexes"].items():
+        print(
+            f"{name:<8} {result['recall_at_k']:>8.3f} {result['memory_mb']['rss']:>8.1f} "
+            f"{result['memory_mb']['anonymous']:>8.1f} {result['open_seconds']:>7.2f} "
+            f"{result['latency_ms']['p50']:>7.2f} {result['latency_ms']['p95']:>7.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--questions", default=QUESTIONS_PATH)
+    parser.add_argument(
+        "--work-dir",
+        help="Keep the built indexes here and reuse them on the next run (default: temporary)",
+    )
+    parser.add_argument("--min-recall", type=float, default=0.99,
+                        help="Lowest accepted int8 recall@k against exact search")
+    parser.add_argument("--max-memory-ratio", type=float, default=0.5,
+                        help="Highest accepted int8 / Chroma anonymous memory growth")
+    parser.add_argument("--output", help="Also write the results to a JSON file")
+    parser.add_argument("--worker", choices=VECTOR_INDEXES, help=argparse.SUPPRESS)
+    parser.add_argument("--store-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    temporary = not args.work_dir
+    args.work_dir = args.work_dir or tempfile.mkdtemp(prefix="vector_index_benchmark_")
+    try:
+        report = run_benchmark(args)
+    finally:
+        if temporary:
+            shutil.rmtree(args.work_dir, ignore_errors=True)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    int8, chroma = report["indexes"]["int8"], report["indexes"]["chroma"]
+    failures = []
+    if int8["recall_at_k"] < args.min_recall:
+        failures.append(f"int8 recall@{args.k} {int8['recall_at_k']:.3f} < {args.min_recall}")
+    ratio = int8["memory_mb"]["anonymous"] / max(chroma["memory_mb"]["anonymous"], 1e-9)
+    if ratio > args.max_memory_ratio:
+        failures.append(f"int8 uses {ratio:.2f} of Chroma's anonymous memory > {args.max_memory_ratio}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"\nOK: int8 recall@{args.k} {int8['recall_at_k']:.3f}, {ratio:.2f} of Chroma's anonymous memory")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,37 @@
+from __future__ import annotations
+
 import os
 import sys
-from typing import List, Dict, Any
+import time
+import json
+import asyncio
+import hashlib
+import threading
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, List, Dict, Any, Tuple, Iterator, AsyncIterator, Union, Optional
 from dotenv import load_dotenv
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader, TextLoader
-from langchain_chroma import Chroma
-from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
-from langchain.prompts import ChatPromptTemplate
-from langchain.schema.runnable import RunnablePassthrough
-from langchain.schema import Document
+from rate_limit import acall_with_retry
+from llm_pool import get_llm, get_prompt, default_provider
+from bm25_index import BM25Index, BM25_INDEX_NAME, is_identifier_query, reciprocal_rank_fusion
+from standard_refs import resolve_where, applicable_where
+from metrics import MetricsRegistry, get_metrics, log_event, estimate_tokens, usage_tokens
+
+# Chroma, langchain, the embedding clients and the PDF pipeline are imported
+# where they are first used, so importing this module and creating a bot
+# stay fast and need no API key
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
 
 # Load environment variables
 load_dotenv()
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
-if not GOOGLE_API_KEY:
-    raise ValueError(
-        "GOOGLE_API_KEY not found in environment variables. Please check your .env file."
-    )
+
+def require_google_api_key():
+    """Raise if GOOGLE_API_KEY is not set (checked when a Gemini client is first needed)"""
+    if not os.getenv("GOOGLE_API_KEY"):
+        raise ValueError(
+            "GOOGLE_API_KEY not found in environment variables. Please check your .env file."
+        )
 
 # Configure paths
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -25,183 +39,935 @@ PROJECT_DIR = os.path.dirname(CURRENT_DIR)
 DATA_DIR = os.path.join(os.path.dirname(PROJECT_DIR), "data")
 VECTOR_DB_DIR = os.path.join(PROJECT_DIR, "vector_db", "aaoifi_standards")
 
+# vector: embeddings only, lexical: BM25 only, hybrid: both fused by reciprocal rank
+RETRIEVAL_MODES = ("vector", "hybrid", "lexical")
+# chroma: Chroma's HNSW index, int8: quantized memory-mapped vectors with
+# exact rerank (quantized_store.py), for replicas short on memory
+VECTOR_INDEXES = ("chroma", "int8")
+
+# Template for formatting context and questions
+QA_PROMPT_TEMPLATE = """
+        You are an expert assistant specializing in Islamic financial standards, particularly the AAOIFI (Accounting and Auditing Organization for Islamic Financial Institutions) standards. 
+        
+        Answer the question based on the following context from AAOIFI Financial Accounting Standards (FAS) and Sharia Standards (SS).
+        
+        If you don't know the answer or the information is not in the context, say "I don't have enough information to answer this question." 
+        Do not make up information that is not provided in the context.
+        
+        Always indicate which specific standard (FAS or SS and its number) you are referencing in your answer.
+        
+        Context:
+        {context}
+        
+        Question: {question}
+        
+        Answer:
+        """
+
+# Metrics recorded for every answered question
+QA_METRICS = {
+    "qa_requests_total": "Questions handled, by status (answered, cached, no_documents, error)",
+    "qa_stage_seconds": "Seconds spent in each pipeline stage",
+    "qa_tokens_total": "Tokens used by each stage (estimated where the provider reports none)",
+    "qa_retrieval_top_score": "Score of the best retrieved chunk, by scorer (vector, rrf, bm25)",
+    "cache_hits": "Cache hits since the process started",
+    "cache_misses": "Cache misses since the process started",
+    "cache_hit_ratio": "Hits divided by lookups for each cache",
+}
+
+
+@dataclass
+class QAResult:
+    """Answer to a question together with the retrieval it was grounded on"""
+
+    question: str
+    answer: str
+    documents: List[Document] = field(default_factory=list)
+    # Chroma distances in vector mode (lower means more similar), fused or
+    # BM25 scores otherwise (higher means more relevant)
+    scores: List[float] = field(default_factory=list)
+    # Seconds spent in each stage: lexical_search, embedding, search,
+    # queued (batches: waiting for an LLM slot), prompt, first_token,
+    # generation, total
+    timings: Dict[str, float] = field(default_factory=dict)
+    # Tokens per stage: embedding (estimated), prompt and completion
+    tokens: Dict[str, int] = field(default_factory=dict)
+    # True when the answer came from the semantic answer cache
+    cached: bool = False
+    # Error message when answering failed
+    error: Optional[str] = None
+    # Chroma where clause that scoped retrieval to specific standards
+    standard_filter: Optional[Dict[str, Any]] = None
+    # Retrieval state needed to generate and cache the answer
+    chunk_ids: List[str] = field(default_factory=list, repr=False)
+    query_embedding: List[float] = field(default=None, repr=False)
+    started: float = field(default_factory=time.perf_counter, repr=False)
+
+    @property
+    def sources(self) -> List[str]:
+        """Human readable source labels for the retrieved documents"""
+        return [
+            f"{doc.metadata.get('source', 'Unknown')} (Page {doc.metadata.get('page', 'Unknown')})"
+            for doc in self.documents
+        ]
+
 
 class AAOIFIQABot:
-    def __init__(self, temperature=0.2, num_results=5):
+    def __init__(
+        self,
+        temperature=0.2,
+        num_results=5,
+        semantic_cache=True,
+        cache_max_distance=0.05,
+        embedding_backend=None,
+        embedding_model=None,
+        embedding_batch_size=32,
+        retrieval_mode="hybrid",
+        vector_index=None,
+        auto_detect_standards=True,
+        llm_provider="google",
+        llm_model=None,
+        llm_options: Optional[Dict[str, Any]] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        persist_directory: Optional[str] = None,
+        data_dir: Optional[str] = None,
+        embeddings=None,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+    ):
         print(f"Initializing AAOIFI QA Bot...")
-        self.embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-1.5-pro", temperature=temperature
-        )
+        # google/openai call the hosted APIs, local embeds on the CPU.
+        # Repeated questions are served from the on-disk embedding cache.
+        self.embedding_backend = embedding_backend
+        self.embedding_model = embedding_model
+        self.embedding_batch_size = embedding_batch_size
+        # Store location, corpus and chunking default to the bot's own vector
+        # database; benchmarks point them elsewhere and pass stub embeddings
+        self.data_dir = data_dir or DATA_DIR
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        # Clients come from the shared pool, so bots with the same settings
+        # reuse one client and its connections. llm_options go to the client,
+        # e.g. base_url/api_key for an OpenAI-compatible server
+        self.llm_provider = llm_provider
+        self.llm_model = llm_model
+        self.llm_options = llm_options or {}
+        self.temperature = temperature
         self.num_results = num_results
+        if retrieval_mode not in RETRIEVAL_MODES:
+            raise ValueError(
+                f"Unknown retrieval mode '{retrieval_mode}'. Choose from: {', '.join(RETRIEVAL_MODES)}"
+            )
+        self.retrieval_mode = retrieval_mode
+        # Replicas pick the index with VECTOR_INDEX, like EMBEDDING_BACKEND
+        vector_index = (vector_index or os.getenv("VECTOR_INDEX", "chroma")).lower()
+        if vector_index not in VECTOR_INDEXES:
+            raise ValueError(
+                f"Unknown vector index '{vector_index}'. Choose from: {', '.join(VECTOR_INDEXES)}"
+            )
+        self.vector_index = vector_index
+        self._bm25_index = None
+        # Scope retrieval to standards named in the question ("FAS 10", "SS 9")
+        self.auto_detect_standards = auto_detect_standards
+
+        # Answers to paraphrased questions with the same retrieved chunks are
+        # reused instead of calling the LLM again
+        self.semantic_cache = semantic_cache
+        self.cache_max_distance = cache_max_distance
+        self._answer_cache = None
+        self._collection_version = None
+
+        # Clients, the vector store and the chain are created on first use.
+        # The lock lets warm_up() open them in the background while a
+        # question is being served.
+        self._lock = threading.RLock()
+        self._embeddings = embeddings
+        self._persist_directory = persist_directory
+        self._vectorstore = None
+        self._retriever = None
+        self._llm = None
+        self._qa_chain = None
+        self._warm_up_thread = None
+
+        # Stage timers, token counts and cache hit rates of every question are
+        # recorded here and logged as one structured event per question
+        self.metrics = metrics or get_metrics()
+        for name, description in QA_METRICS.items():
+            self.metrics.describe(name, description)
+
+        # Keep track of the last retrieved documents
+        self.last_retrieved_docs = []
 
-        # Initialize vector store
-        if not os.path.exists(VECTOR_DB_DIR) or os.listdir(VECTOR_DB_DIR) == []:
-            print("Vector database not found or empty. Creating new database...")
-            self.vectorstore = self._create_vector_store()
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            with self._lock:
+                if self._embeddings is None:
+                    from embedding_backends import default_backend, get_embeddings
+
+                    if (self.embedding_backend or default_backend()).lower() == "google":
+                        require_google_api_key()
+                    self._embeddings = get_embeddings(
+                        self.embedding_backend,
+                        self.embedding_model,
+                        batch_size=self.embedding_batch_size,
+                    )
+        return self._embeddings
+
+    @property
+    def persist_directory(self) -> str:
+        if self._persist_directory is None:
+            from embedding_backends import backend_persist_directory
+
+            self._persist_directory = backend_persist_directory(
+                VECTOR_DB_DIR, self.embedding_backend
+            )
+        return self._persist_directory
+
+    @property
+    def vectorstore(self):
+        """Chroma store, opened and synced with the data directory on first use"""
+        if self._vectorstore is None:
+            with self._lock:
+                if self._vectorstore is None:
+                    self._open_vectorstore()
+        return self._vectorstore
+
+    def _open_vectorstore(self) -> Dict[str, Any]:
+        from langchain_chroma import Chroma
+        from embedding_backends import check_backend_record
+        from ingestion import IngestionEngine
+
+        # Open the vector store and bring it in sync with the data directory.
+        # Only new or changed standards are parsed and embedded.
+        check_backend_record(
+            self.persist_directory, self.embedding_backend, self.embedding_model
+        )
+        vectorstore = Chroma(
+            persist_directory=self.persist_directory,
+            embedding_function=self.embeddings,
+        )
+        self.ingestion = IngestionEngine(
+            vectorstore,
+            self.embeddings,
+            self.data_dir,
+            self.persist_directory,
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
+            batch_size=self.embedding_batch_size,
+        )
+        summary = self._sync_ingestion()
+        if self.vector_index == "int8":
+            from quantized_store import QuantizedVectorStore, QUANTIZED_INDEX_NAME
+
+            # Versioned by the ingest manifest, so an up-to-date replica
+            # serves from the saved index without loading Chroma's vectors
+            vectorstore = QuantizedVectorStore(
+                vectorstore,
+                os.path.join(self.persist_directory, QUANTIZED_INDEX_NAME),
+                version=self.ingestion.manifest_fingerprint,
+            )
+            count = len(vectorstore.index)
         else:
-            print("Loading existing vector database...")
-            self.vectorstore = Chroma(
-                persist_directory=VECTOR_DB_DIR, embedding_function=self.embeddings
+            count = vectorstore._collection.count()
+        print(f"Vector database loaded with {count} documents")
+        # Published only once synced, so other threads never see a stale store
+        self._vectorstore = vectorstore
+        return summary
+
+    @property
+    def retriever(self):
+        if self._retriever is None:
+            self._retriever = self.vectorstore.as_retriever(
+                search_type="similarity", search_kwargs={"k": self.num_results}
             )
-            print(
-                f"Vector database loaded with {self.vectorstore._collection.count()} documents"
+        return self._retriever
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            if (self.llm_provider or default_provider()).lower() == "google":
+                require_google_api_key()
+            self._llm = get_llm(
+                self.llm_provider,
+                self.llm_model,
+                temperature=self.temperature,
+                **self.llm_options,
             )
+        return self._llm
+
+    @property
+    def qa_chain(self):
+        if self._qa_chain is None:
+            self._setup_qa_chain()
+        return self._qa_chain
+
+    @property
+    def answer_cache(self):
+        if self._answer_cache is None and self.semantic_cache:
+            with self._lock:
+                if self._answer_cache is None:
+                    from answer_cache import ANSWER_CACHE_NAME, SemanticAnswerCache
+
+                    self._answer_cache = SemanticAnswerCache(
+                        os.path.join(self.persist_directory, ANSWER_CACHE_NAME),
+                        max_distance=self.cache_max_distance,
+                    )
+        return self._answer_cache
+
+    def warm_up(self, background: bool = True) -> Optional[threading.Thread]:
+        """Open the vector store, search indexes and LLM client ahead of the first question.
+
+        With background=True this runs in a daemon thread (started once) and
+        the thread is returned; questions asked meanwhile wait for the store.
+        """
+        def run():
+            try:
+                self.vectorstore
+                if self.retrieval_mode != "vector":
+                    self.bm25_index
+                self.qa_chain
+            except Exception as e:
+                print(f"Warm-up failed: {str(e)}")
 
-        self.retriever = self.vectorstore.as_retriever(
-            search_type="similarity", search_kwargs={"k": self.num_results}
+        if not background:
+            run()
+            return None
+        with self._lock:
+            if self._warm_up_thread is None:
+                self._warm_up_thread = threading.Thread(
+                    target=run, name="qa-bot-warm-up", daemon=True
+                )
+                self._warm_up_thread.start()
+        return self._warm_up_thread
+
+    def sync_documents(self) -> Dict[str, Any]:
+        """Ingest new or changed standards and drop deleted ones"""
+        with self._lock:
+            if self._vectorstore is None:
+                return self._open_vectorstore()
+            return self._sync_ingestion()
+
+    def _sync_ingestion(self) -> Dict[str, Any]:
+        summary = self.ingestion.sync()
+        # The int8 index follows the manifest, which any change rewrites
+        if any(summary[key] for key in ("changed", "removed", "metadata_updated")):
+            invalidate_quantized = getattr(self._vectorstore, "invalidate", None)
+            if invalidate_quantized:
+                invalidate_quantized()
+        if summary["changed"] or summary["removed"]:
+            # The collection changed, so cached answers and the BM25 index are stale
+            self._collection_version = None
+            self._bm25_index = None
+        elif summary["metadata_updated"]:
+            # Same chunks with new metadata: the saved BM25 index still matches
+            # the collection version, so remove it to force a rebuild
+            self._bm25_index = None
+            bm25_path = os.path.join(self.persist_directory, BM25_INDEX_NAME)
+            if os.path.exists(bm25_path):
+                os.remove(bm25_path)
+        return summary
+
+    @property
+    def bm25_index(self) -> BM25Index:
+        """BM25 index over the collection's chunks, persisted next to Chroma.
+
+        Rebuilt from the collection when the saved index belongs to a
+        different collection version.
+        """
+        if self._bm25_index is None:
+            with self._lock:
+                if self._bm25_index is None:
+                    self._bm25_index = self._load_bm25_index()
+        return self._bm25_index
+
+    def _load_bm25_index(self) -> BM25Index:
+        path = os.path.join(self.persist_directory, BM25_INDEX_NAME)
+        version = self.collection_version()
+        if os.path.exists(path):
+            index = BM25Index.load(path)
+            if index.version == version:
+                return index
+
+        print("Building BM25 index...")
+        contents = self.vectorstore._collection.get(
+            include=["documents", "metadatas"]
+        )
+        index = BM25Index().build(
+            contents["ids"], contents["documents"], contents["metadatas"], version
         )
+        index.save(path)
+        return index
 
-        # Setup the QA chain
-        self._setup_qa_chain()
+    def _setup_qa_chain(self):
+        """Set up the QA chain for answering questions about AAOIFI standards"""
+        # Create the prompt from template
+        prompt = get_prompt(QA_PROMPT_TEMPLATE, chat=True)
+
+        # Create the generation chain. Retrieval happens once in answer() and
+        # the formatted context is passed in, so the retriever is not re-run.
+        self._qa_chain = prompt | self.llm
+
+    def collection_version(self) -> str:
+        """Fingerprint of the indexed chunk ids, used to invalidate cached answers"""
+        if self._collection_version is None:
+            # The int8 index holds the chunk ids without reading Chroma
+            chunk_ids = getattr(self.vectorstore, "chunk_ids", None)
+            if chunk_ids:
+                ids = sorted(chunk_ids())
+            else:
+                ids = sorted(self.vectorstore._collection.get(include=[])["ids"])
+            digest = hashlib.sha1("\n".join(ids).encode("utf-8")).hexdigest()
+            self._collection_version = f"{len(ids)}:{digest}"
+        return self._collection_version
+
+    def retrieve(
+        self,
+        question: str,
+        timings: Dict[str, float] = None,
+        standard_type: Optional[str] = None,
+        standard_number: Optional[str] = None,
+    ) -> Tuple[List[Document], List[float]]:
+        """Retrieve the chunks for a question with the configured retrieval mode.
+
+        standard_type ("FAS" or "SS") and standard_number restrict the search
+        inside Chroma; without them, standards named in the question are used.
+        """
+        where = self.standard_filter(question, standard_type, standard_number)
+        _, documents, scores = self._retrieve(question, timings, where)
+        return documents, scores
+
+    def standard_filter(
+        self,
+        question: str,
+        standard_type: Optional[str] = None,
+        standard_number: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Where clause scoping a question's retrieval, None to search everything"""
+        where = resolve_where(
+            question, standard_type, standard_number, self.auto_detect_standards
+        )
+        return applicable_where(self.vectorstore, where)
 
-        # Keep track of the last retrieved documents
-        self.last_retrieved_docs = []
+    def _retrieve(
+        self,
+        question: str,
+        timings: Dict[str, float] = None,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[List[float], List[Document], List[float]]:
+        """Retrieve documents, also returning the query embedding.
 
-    def _create_vector_store(self) -> Chroma:
-        """Create a vector store from the AAOIFI standards documents"""
-        documents = self._load_documents()
+        The embedding is None when BM25 answered the query on its own.
+        """
+        timings = timings if timings is not None else {}
 
-        if not documents:
-            print(
-                "No documents were loaded! Check the data directory and file formats."
+        hits = []
+        if self.retrieval_mode != "vector":
+            start = time.perf_counter()
+            hits = self.bm25_index.search(
+                question, k=self._candidate_count(), where=where
             )
-            return None
+            timings["lexical_search"] = time.perf_counter() - start
+
+            top_hits = hits[: self.num_results]
+            if self.retrieval_mode == "lexical" or (
+                is_identifier_query(question) and self.bm25_index.covers(question, top_hits)
+            ):
+                documents = [self.bm25_index.document(i) for i, _ in top_hits]
+                return None, documents, [score for _, score in top_hits]
+
+        start = time.perf_counter()
+        query_embedding = self.embeddings.embed_query(question)
+        timings["embedding"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        docs_and_scores = (
+            self.vectorstore.similarity_search_by_vector_with_relevance_scores(
+                query_embedding, k=self._candidate_count(), filter=where
+            )
+        )
+        timings["search"] = time.perf_counter() - start
 
-        splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        splits = splitter.split_documents(documents)
+        if self.retrieval_mode == "hybrid":
+            documents, scores = self._fuse(docs_and_scores, hits)
+        else:
+            documents = [doc for doc, _ in docs_and_scores]
+            scores = [score for _, score in docs_and_scores]
+        return query_embedding, documents, scores
+
+    def _candidate_count(self) -> int:
+        """Candidates fetched from each retriever before fusion"""
+        if self.retrieval_mode == "vector":
+            return self.num_results
+        return max(2 * self.num_results, 10)
+
+    def _fuse(
+        self,
+        docs_and_scores: List[Tuple[Document, float]],
+        hits: List[Tuple[int, float]],
+    ) -> Tuple[List[Document], List[float]]:
+        """Merge vector and BM25 candidates by reciprocal rank fusion"""
+        from answer_cache import document_id
+
+        docs_by_id = {document_id(doc): doc for doc, _ in docs_and_scores}
+        lexical_ids = []
+        for doc_index, _ in hits:
+            doc_id = self.bm25_index.ids[doc_index]
+            lexical_ids.append(doc_id)
+            docs_by_id.setdefault(doc_id, self.bm25_index.document(doc_index))
+
+        fused = reciprocal_rank_fusion(
+            [[document_id(doc) for doc, _ in docs_and_scores], lexical_ids]
+        )[: self.num_results]
+        return [docs_by_id[doc_id] for doc_id, _ in fused], [
+            score for _, score in fused
+        ]
+
+    @staticmethod
+    def _format_context(documents: List[Document]) -> str:
+        """Join retrieved chunks into the context block of the prompt"""
+        return "\n\n".join(doc.page_content for doc in documents)
+
+    def prepare_answer(
+        self,
+        question: str,
+        standard_type: Optional[str] = None,
+        standard_number: Optional[str] = None,
+    ) -> QAResult:
+        """Retrieve the context for a question without generating an answer.
+
+        The returned QAResult already holds the documents and sources. Its
+        answer is only set when no generation is needed: a semantic cache
+        hit, no relevant documents, or an error.
+        """
+        result = QAResult(question=question, answer="")
+        try:
+            print(f"Retrieving relevant documents for: '{question}'")
+            result.standard_filter = self.standard_filter(
+                question, standard_type, standard_number
+            )
+            result.query_embedding, result.documents, result.scores = self._retrieve(
+                question, result.timings, result.standard_filter
+            )
+            self.last_retrieved_docs = result.documents  # Store for later access
+            print(f"Retrieved {len(result.documents)} documents")
 
-        print(f"Creating vector store with {len(splits)} document chunks...")
+            if len(result.documents) == 0:
+                result.answer = "No relevant information found in the standards. Please try a different question."
+                return result
 
-        if len(splits) == 0:
+            # Print a preview of the first document to verify content
             print(
-                "Warning: No document chunks were created! Check if documents contain text."
+                f"First document preview: {result.documents[0].page_content[:150]}..."
             )
-            return None
 
-        # Create and persist the vector store
-        vectorstore = Chroma.from_documents(
-            documents=splits, embedding=self.embeddings, persist_directory=VECTOR_DB_DIR
+            self._check_answer_cache(result)
+        except Exception as e:
+            result.error = str(e)
+            result.answer = f"Error processing your question: {str(e)}"
+        return result
+
+    def _check_answer_cache(self, result: QAResult):
+        """Fill in the answer from the semantic answer cache on a hit"""
+        from answer_cache import document_id
+
+        result.chunk_ids = [document_id(doc) for doc in result.documents]
+        # Keyword queries answered by BM25 alone have no embedding to match on
+        if self.answer_cache is None or result.query_embedding is None:
+            return
+        cached_answer = self.answer_cache.lookup(
+            result.query_embedding,
+            result.chunk_ids,
+            self.collection_version(),
+            self._generation_key(),
+        )
+        if cached_answer is not None:
+            print("Answer served from the semantic answer cache")
+            result.answer = cached_answer
+            result.cached = True
+
+    def _generation_key(self) -> str:
+        """Settings a cached answer must share to be reused"""
+        from answer_cache import generation_key
+
+        return generation_key(
+            self.llm_provider or default_provider(),
+            self.llm_model,
+            self.temperature,
+            QA_PROMPT_TEMPLATE,
         )
-        print(f"Vector store created with {vectorstore._collection.count()} documents")
-        return vectorstore
-
-    def _load_documents(self) -> List[Document]:
-        """Load all FAS and SS documents from the data directory"""
-        documents = []
 
-        if not os.path.exists(DATA_DIR):
-            raise FileNotFoundError(f"Data directory not found: {DATA_DIR}")
+    def _generation_inputs(self, result: QAResult) -> Dict[str, str]:
+        start = time.perf_counter()
+        inputs = {
+            "context": self._format_context(result.documents),
+            "question": result.question,
+        }
+        result.timings["prompt"] = time.perf_counter() - start
+        return inputs
+
+    @staticmethod
+    def _count_generation_tokens(result: QAResult, inputs: Dict[str, str], message):
+        """Prompt and completion tokens as reported by the LLM, else estimated"""
+        usage = usage_tokens(message)
+        if usage is None:
+            usage = (
+                estimate_tokens(inputs["context"] + inputs["question"]),
+                estimate_tokens(result.answer),
+            )
+        result.tokens["prompt"], result.tokens["completion"] = usage
+
+    def _finish_answer(self, result: QAResult, generation_start: float):
+        """Record timings and cache a freshly generated answer"""
+        result.timings["generation"] = time.perf_counter() - generation_start
+        if self.answer_cache is not None and result.query_embedding is not None:
+            self.answer_cache.store(
+                result.question,
+                result.query_embedding,
+                result.chunk_ids,
+                self.collection_version(),
+                result.answer,
+                self._generation_key(),
+            )
+        self._complete(result)
+
+    def _complete(self, result: QAResult):
+        """Record the total time and export the question's metrics"""
+        result.timings["total"] = time.perf_counter() - result.started
+        if result.error:
+            status = "error"
+        elif result.cached:
+            status = "cached"
+        elif not result.documents:
+            status = "no_documents"
+        else:
+            status = "answered"
+        if "embedding" in result.timings:
+            result.tokens.setdefault("embedding", estimate_tokens(result.question))
+
+        self.metrics.inc("qa_requests_total", status=status)
+        for stage, seconds in result.timings.items():
+            self.metrics.observe("qa_stage_seconds", seconds, stage=stage)
+        for stage, count in result.tokens.items():
+            self.metrics.inc("qa_tokens_total", count, stage=stage)
+        if result.scores:
+            self.metrics.observe(
+                "qa_retrieval_top_score", result.scores[0], scorer=self._scorer(result)
+            )
+        caches = {
+            "embedding": getattr(self._embeddings, "cache", None),
+            "answer": self._answer_cache,
+        }
+        for name, cache in caches.items():
+            if cache is None:
+                continue
+            lookups = cache.hits + cache.misses
+            self.metrics.set_gauge("cache_hits", cache.hits, cache=name)
+            self.metrics.set_gauge("cache_misses", cache.misses, cache=name)
+            self.metrics.set_gauge(
+                "cache_hit_ratio", cache.hits / lookups if lookups else 0.0, cache=name
+            )
 
-        print(f"Loading documents from {DATA_DIR}...")
+        log_event(
+            "qa_request",
+            question=result.question,
+            status=status,
+            error=result.error,
+            retrieval_mode=self.retrieval_mode,
+            standard_filter=result.standard_filter,
+            documents=len(result.documents),
+            top_score=result.scores[0] if result.scores else None,
+            scorer=self._scorer(result) if result.scores else None,
+            timings=result.timings,
+            tokens=result.tokens,
+        )
 
-        # List all files in data directory
-        all_files = os.listdir(DATA_DIR)
-        fas_ss_files = [f for f in all_files if f.upper().startswith(("FAS", "SS"))]
+    def _scorer(self, result: QAResult) -> str:
+        """Retrieval path that produced a result's scores; each has its own scale"""
+        # BM25 answered alone when the question was never embedded
+        if result.query_embedding is None:
+            return "bm25"
+        return "rrf" if self.retrieval_mode == "hybrid" else "vector"
+
+    def answer(
+        self,
+        question: str,
+        standard_type: Optional[str] = None,
+        standard_number: Optional[str] = None,
+    ) -> QAResult:
+        """Answer a question, retrieving context only once.
+
+        Returns a QAResult holding the answer, the retrieved documents, their
+        scores and per-stage timings.
+        """
+        result = self.prepare_answer(question, standard_type, standard_number)
+        if result.answer:
+            self._complete(result)
+            return result
 
-        print(
-            f"Found {len(fas_ss_files)} potential FAS/SS files: {', '.join(fas_ss_files)}"
+        start = time.perf_counter()
+        try:
+            inputs = self._generation_inputs(result)
+            response = self.qa_chain.invoke(inputs)
+            result.answer = response.content
+            self._count_generation_tokens(result, inputs, response)
+        except Exception as e:
+            result.error = str(e)
+            result.answer = f"Error processing your question: {str(e)}"
+            self._complete(result)
+            return result
+        self._finish_answer(result, start)
+        return result
+
+    def stream_answer(self, question: Union[str, QAResult]) -> Iterator[str]:
+        """Yield the answer to a question as tokens arrive from the LLM.
+
+        Pass the QAResult from prepare_answer() to show its sources before
+        generation starts; the result's answer and timings are filled in
+        once the stream is exhausted.
+        """
+        result = (
+            question
+            if isinstance(question, QAResult)
+            else self.prepare_answer(question)
         )
+        if result.answer:
+            self._complete(result)
+            yield result.answer
+            return
+
+        start = time.perf_counter()
+        parts = []
+        message = None
+        try:
+            inputs = self._generation_inputs(result)
+            for chunk in self.qa_chain.stream(inputs):
+                if not parts:
+                    result.timings["first_token"] = time.perf_counter() - start
+                parts.append(chunk.content)
+                # Adding chunks sums their usage metadata
+                message = chunk if message is None else message + chunk
+                yield chunk.content
+        except Exception as e:
+            result.error = str(e)
+            result.answer = f"Error processing your question: {str(e)}"
+            self._complete(result)
+            yield result.answer
+            return
+        result.answer = "".join(parts)
+        self._count_generation_tokens(result, inputs, message)
+        self._finish_answer(result, start)
+
+    async def astream_answer(self, question: Union[str, QAResult]) -> AsyncIterator[str]:
+        """Async version of stream_answer()"""
+        result = (
+            question
+            if isinstance(question, QAResult)
+            else await asyncio.to_thread(self.prepare_answer, question)
+        )
+        if result.answer:
+            self._complete(result)
+            yield result.answer
+            return
+
+        start = time.perf_counter()
+        parts = []
+        message = None
+        try:
+            inputs = self._generation_inputs(result)
+            async for chunk in self.qa_chain.astream(inputs):
+                if not parts:
+                    result.timings["first_token"] = time.perf_counter() - start
+                parts.append(chunk.content)
+                message = chunk if message is None else message + chunk
+                yield chunk.content
+        except Exception as e:
+            result.error = str(e)
+            result.answer = f"Error processing your question: {str(e)}"
+            self._complete(result)
+            yield result.answer
+            return
+        result.answer = "".join(parts)
+        self._count_generation_tokens(result, inputs, message)
+        # Cache writes hit SQLite, so keep them off the event loop
+        await asyncio.to_thread(self._finish_answer, result, start)
+
+    def _prepare_batch(self, questions: List[str]) -> List[QAResult]:
+        """Embed all questions in one request and search for them in one query.
+
+        A failed retrieval sets the error of the questions it was for, so the
+        batch still returns one result per question.
+        """
+        results = [QAResult(question=question, answer="") for question in questions]
 
-        total_loaded = 0
-        for filename in fas_ss_files:
-            file_path = os.path.join(DATA_DIR, filename)
-
-            # Skip directories
-            if os.path.isdir(file_path):
+        for result in results:
+            try:
+                result.standard_filter = self.standard_filter(result.question)
+            except Exception as e:
+                self._set_error(result, e)
+
+        # Chroma takes one where clause per query, so questions are searched
+        # together per distinct standard filter. Questions BM25 may answer
+        # alone take the single-question path, as they do in answer()
+        groups = {}
+        for result in results:
+            if result.error:
                 continue
-
+            if self.retrieval_mode == "lexical" or (
+                self.retrieval_mode == "hybrid" and is_identifier_query(result.question)
+            ):
+                try:
+                    result.query_embedding, result.documents, result.scores = self._retrieve(
+                        result.question, result.timings, result.standard_filter
+                    )
+                except Exception as e:
+                    self._set_error(result, e)
+            else:
+                key = json.dumps(result.standard_filter, sort_keys=True)
+                groups.setdefault(key, []).append(result)
+        for group in groups.values():
             try:
-                if filename.lower().endswith(".pdf"):
-                    loader = PyPDFLoader(file_path)
-                    doc_pages = loader.load()
-                    # Add source metadata
-                    for doc in doc_pages:
-                        if "source" not in doc.metadata:
-                            doc.metadata["source"] = filename
-                    documents.extend(doc_pages)
-                    print(f"Loaded PDF: {filename} - {len(doc_pages)} pages")
-                    total_loaded += len(doc_pages)
-                elif filename.lower().endswith(".txt"):
-                    loader = TextLoader(file_path)
-                    doc_pages = loader.load()
-                    # Add source metadata
-                    for doc in doc_pages:
-                        if "source" not in doc.metadata:
-                            doc.metadata["source"] = filename
-                    documents.extend(doc_pages)
-                    print(f"Loaded TXT: {filename} - {len(doc_pages)} pages")
-                    total_loaded += len(doc_pages)
-                else:
-                    print(f"Skipping unsupported file format: {filename}")
+                self._search_batch(group)
             except Exception as e:
-                print(f"Error loading {filename}: {str(e)}")
+                for result in group:
+                    self._set_error(result, e)
 
-        if not documents:
-            print(
-                "WARNING: No documents were loaded. Check your data directory and file formats."
-            )
-            return []
-
-        print(
-            f"Successfully loaded {len(documents)} document pages from {total_loaded} files."
+        for result in results:
+            if result.error:
+                continue
+            if not result.documents:
+                result.answer = "No relevant information found in the standards. Please try a different question."
+            else:
+                try:
+                    self._check_answer_cache(result)
+                except Exception as e:
+                    self._set_error(result, e)
+        return results
+
+    @staticmethod
+    def _set_error(result: QAResult, error: Exception):
+        result.error = str(error)
+        result.answer = f"Error processing your question: {str(error)}"
+
+    def _search_batch(self, results: List[QAResult]):
+        """Vector search for questions sharing one standard filter, fused with BM25 in hybrid mode"""
+        from langchain_core.documents import Document
+
+        where = results[0].standard_filter
+        start = time.perf_counter()
+        # Embeddings passed in without the cache wrapper embed queries as documents
+        embed_queries = getattr(self.embeddings, "embed_queries", self.embeddings.embed_documents)
+        query_embeddings = embed_queries([result.question for result in results])
+        embedding_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        # The quantized store answers collection queries itself
+        query = getattr(self.vectorstore, "query", self.vectorstore._collection.query)
+        matches = query(
+            query_embeddings=query_embeddings,
+            n_results=self._candidate_count(),
+            where=where,
+            include=["documents", "metadatas", "distances"],
         )
-        return documents
+        search_time = time.perf_counter() - start
+
+        for i, result in enumerate(results):
+            # Batch stage times are shared by every question in the batch
+            result.timings["embedding"] = embedding_time
+            result.timings["search"] = search_time
+            result.query_embedding = query_embeddings[i]
+            docs_and_scores = [
+                (Document(page_content=text, metadata=metadata or {}, id=chunk_id), distance)
+                for text, metadata, chunk_id, distance in zip(
+                    matches["documents"][i],
+                    matches["metadatas"][i],
+                    matches["ids"][i],
+                    matches["distances"][i],
+                )
+            ]
 
-    def _setup_qa_chain(self):
-        """Set up the QA chain for answering questions about AAOIFI standards"""
-        # Template for formatting context and questions
-        template = """
-        You are an expert assistant specializing in Islamic financial standards, particularly the AAOIFI (Accounting and Auditing Organization for Islamic Financial Institutions) standards. 
-        
-        Answer the question based on the following context from AAOIFI Financial Accounting Standards (FAS) and Sharia Standards (SS).
-        
-        If you don't know the answer or the information is not in the context, say "I don't have enough information to answer this question." 
-        Do not make up information that is not provided in the context.
-        
-        Always indicate which specific standard (FAS or SS and its number) you are referencing in your answer.
-        
-        Context:
-        {context}
-        
-        Question: {question}
-        
-        Answer:
+            if self.retrieval_mode == "hybrid":
+                start = time.perf_counter()
+                hits = self.bm25_index.search(
+                    result.question, k=self._candidate_count(), where=where
+                )
+                result.timings["lexical_search"] = time.perf_counter() - start
+                result.documents, result.scores = self._fuse(docs_and_scores, hits)
+            else:
+                result.documents = [doc for doc, _ in docs_and_scores]
+                result.scores = [distance for _, distance in docs_and_scores]
+
+    async def aanswer_batch(
+        self, questions: List[str], max_concurrency: int = 4, max_retries: int = 5
+    ) -> List[QAResult]:
+        """Answer many questions with at most max_concurrency LLM calls in flight.
+
+        Rate limit and transient errors are retried with exponential backoff.
         """
+        from embedding_cache import normalize_text
 
-        # Create the prompt from template
-        prompt = ChatPromptTemplate.from_template(template)
-
-        # Create the RAG chain
-        self.qa_chain = (
-            {"context": self.retriever, "question": RunnablePassthrough()}
-            | prompt
-            | self.llm
+        if not questions:
+            return []
+        results = await asyncio.to_thread(self._prepare_batch, questions)
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def generate(result: QAResult):
+            if result.answer:
+                self._complete(result)
+                return
+            queued = time.perf_counter()
+            async with semaphore:
+                start = time.perf_counter()
+                result.timings["queued"] = start - queued
+                try:
+                    inputs = self._generation_inputs(result)
+                    response = await acall_with_retry(
+                        self.qa_chain.ainvoke, inputs, max_retries=max_retries
+                    )
+                    result.answer = response.content
+                    self._count_generation_tokens(result, inputs, response)
+                except Exception as e:
+                    result.error = str(e)
+                    result.answer = f"Error processing your question: {str(e)}"
+                    self._complete(result)
+                    return
+            await asyncio.to_thread(self._finish_answer, result, start)
+
+        async def generate_once(repeats: List[QAResult]):
+            # Repeated questions within the batch are generated once and
+            # completed together with the first
+            first = repeats[0]
+            await generate(first)
+            for result in repeats[1:]:
+                result.answer = first.answer
+                result.cached = first.cached
+                result.error = first.error
+                if "queued" in first.timings:
+                    result.timings["queued"] = first.timings["queued"]
+                self._complete(result)
+
+        unique = {}
+        for result in results:
+            unique.setdefault(normalize_text(result.question), []).append(result)
+        await asyncio.gather(*(generate_once(repeats) for repeats in unique.values()))
+        return results
+
+    def answer_batch(
+        self, questions: List[str], max_concurrency: int = 4, max_retries: int = 5
+    ) -> List[QAResult]:
+        """Answer many questions concurrently (see aanswer_batch).
+
+        Each call runs its own event loop. Gemini's async client stays bound
+        to the first one, so answer several batches by awaiting aanswer_batch
+        in one loop, as batch_qa.py does.
+        """
+        return asyncio.run(
+            self.aanswer_batch(questions, max_concurrency, max_retries)
         )
 
     def answer_question(self, question: str) -> str:
         """Answer a question using the QA chain"""
-        try:
-            print(f"Retrieving relevant documents for: '{question}'")
-            # Get retrieval results directly to debug
-            retrieved_docs = self.retriever.invoke(question)
-            self.last_retrieved_docs = retrieved_docs  # Store for later access
-            print(f"Retrieved {len(retrieved_docs)} documents")
-
-            if len(retrieved_docs) == 0:
-                return "No relevant information found in the standards. Please try a different question."
-
-            # Print a preview of the first document to verify content
-            if retrieved_docs:
-                print(
-                    f"First document preview: {retrieved_docs[0].page_content[:150]}..."
-                )
-
-            # Continue with the chain
-            response = self.qa_chain.invoke(question)
-            return response.content
-        except Exception as e:
-            return f"Error processing your question: {str(e)}"
+        return self.answer(question).answer
 
     def get_retrieved_documents(self) -> List[Document]:
         """Get the documents retrieved for the last question"""
@@ -209,14 +975,17 @@ class AAOIFIQABot:
 
     def set_temperature(self, temperature: float):
         """Set the temperature for the LLM"""
-        if hasattr(self, "llm") and hasattr(self.llm, "temperature"):
-            self.llm.temperature = temperature
+        # Pooled clients are shared, so switch clients instead of mutating one
+        if temperature != self.temperature:
+            self.temperature = temperature
+            self._llm = None
+            self._qa_chain = None
 
     def set_num_results(self, num_results: int):
         """Set the number of results to retrieve"""
         self.num_results = num_results
-        if hasattr(self, "retriever") and hasattr(self.retriever, "search_kwargs"):
-            self.retriever.search_kwargs["k"] = num_results
+        if self._retriever is not None:
+            self._retriever.search_kwargs["k"] = num_results
 
     def run_interactive_qa(self):
         """Run an interactive QA session in the terminal"""
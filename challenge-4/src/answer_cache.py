@@ -0,0 +1,198 @@
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+
+# Kept next to the vector store, so bots on other stores never share it
+ANSWER_CACHE_NAME = "answers.sqlite3"
+
+
+def document_id(doc) -> str:
+    """Stable identifier of a retrieved chunk.
+
+    Uses the vector store id when the Document carries one, otherwise a hash
+    of its source, page and content.
+    """
+    if getattr(doc, "id", None):
+        return str(doc.id)
+    payload = "\x00".join(
+        [
+            str(doc.metadata.get("source", "")),
+            str(doc.metadata.get("page", "")),
+            doc.page_content,
+        ]
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def generation_key(provider: str, model: Optional[str], temperature: float, template: str) -> str:
+    """Hash of the settings an answer was generated with"""
+    payload = json.dumps([provider, model, temperature, template])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class SemanticAnswerCache:
+    """Answer cache keyed by query embedding.
+
+    A cached answer is reused when a new question lies within max_distance
+    (cosine distance) of a cached question, the retrieved chunk ids are the
+    same, and the entry was stored against the current collection version
+    and generation settings (see generation_key). Entries of other versions
+    are never matched and age out as the oldest entries are evicted.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_distance: float = 0.05,
+        max_entries: int = 5000,
+    ):
+        self.path = path
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._version = None
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._entries = []
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                collection_version TEXT NOT NULL,
+                question TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                chunk_ids TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                created REAL NOT NULL,
+                generation TEXT NOT NULL DEFAULT ''
+            )
+            """
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(answers)")]
+        if "generation" not in columns:
+            # Caches written before generation keys; their rows never match
+            self._conn.execute(
+                "ALTER TABLE answers ADD COLUMN generation TEXT NOT NULL DEFAULT ''"
+            )
+        self._conn.commit()
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _load(self, collection_version: str):
+        """Load the entries of a collection version"""
+        if self._version == collection_version:
+            return
+
+        rows = self._conn.execute(
+            "SELECT id, embedding, generation, chunk_ids, answer FROM answers "
+            "WHERE collection_version = ? ORDER BY id",
+            (collection_version,),
+        ).fetchall()
+
+        self._entries = [
+            (row_id, generation, json.loads(chunk_ids), answer)
+            for row_id, _, generation, chunk_ids, answer in rows
+        ]
+        if rows:
+            self._matrix = np.stack(
+                [np.frombuffer(row[1], dtype=np.float32) for row in rows]
+            )
+        else:
+            self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._version = collection_version
+
+    def lookup(
+        self,
+        query_embedding,
+        chunk_ids: List[str],
+        collection_version: str,
+        generation: str = "",
+    ) -> Optional[str]:
+        """Return a cached answer for a paraphrase of the question, if any"""
+        query = self._normalize(query_embedding)
+        with self._lock:
+            self._load(collection_version)
+            if not self._entries or self._matrix.shape[1] != query.shape[0]:
+                self.misses += 1
+                return None
+
+            distances = 1.0 - self._matrix @ query
+            for i in np.argsort(distances):
+                if distances[i] > self.max_distance:
+                    break
+                _, cached_generation, cached_chunk_ids, answer = self._entries[i]
+                if cached_generation == generation and cached_chunk_ids == list(chunk_ids):
+                    self.hits += 1
+                    return answer
+
+        self.misses += 1
+        return None
+
+    def store(
+        self,
+        question: str,
+        query_embedding,
+        chunk_ids: List[str],
+        collection_version: str,
+        answer: str,
+        generation: str = "",
+    ):
+        """Cache an answer generated for the given retrieval"""
+        vector = self._normalize(query_embedding)
+        with self._lock:
+            self._load(collection_version)
+            cursor = self._conn.execute(
+                "INSERT INTO answers "
+                "(collection_version, generation, question, embedding, chunk_ids, answer, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    collection_version,
+                    generation,
+                    question,
+                    vector.tobytes(),
+                    json.dumps(list(chunk_ids)),
+                    answer,
+                    time.time(),
+                ),
+            )
+
+            self._entries.append((cursor.lastrowid, generation, list(chunk_ids), answer))
+            if self._matrix.size:
+                self._matrix = np.vstack([self._matrix, vector])
+            else:
+                self._matrix = vector.reshape(1, -1)
+
+            # Drop the oldest entries of any version once the cache is full
+            excess = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0] - self.max_entries
+            if excess > 0:
+                newest_dropped = self._conn.execute(
+                    "SELECT MAX(id) FROM (SELECT id FROM answers ORDER BY id ASC LIMIT ?)",
+                    (excess,),
+                ).fetchone()[0]
+                self._conn.execute("DELETE FROM answers WHERE id <= ?", (newest_dropped,))
+                keep = [i for i, entry in enumerate(self._entries) if entry[0] > newest_dropped]
+                self._entries = [self._entries[i] for i in keep]
+                self._matrix = self._matrix[keep]
+            self._conn.commit()
+
+    def clear(self):
+        """Remove every cached answer"""
+        with self._lock:
+            self._conn.execute("DELETE FROM answers")
+            self._conn.commit()
+            self._version = None
@@ -0,0 +1,190 @@
+import os
+import re
+import gzip
+import json
+import math
+from collections import Counter
+from typing import TYPE_CHECKING, List, Dict, Any, Tuple
+
+from standard_refs import STANDARD_REF_PATTERN, matches_where
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+BM25_INDEX_NAME = "bm25_index.json.gz"
+
+# Clause numbers like 3/1/2 or 8.2 stay one token; words keep inner apostrophes (Istisna'a)
+TOKEN_PATTERN = re.compile(r"\d+(?:[./]\d+)+|\w+(?:['’]\w+)*")
+
+STOPWORDS = frozenset(
+    """a an and are as at be by for from how in is it of on or that the this to
+    what when where which who why with does do should according about under""".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word, number and clause tokens without stopwords"""
+    return [
+        token
+        for token in TOKEN_PATTERN.findall(text.lower().replace("’", "'"))
+        if token not in STOPWORDS
+    ]
+
+
+CLAUSE_PATTERN = re.compile(r"\b\d+(?:[./]\d+)+\b")
+# Words that may accompany a reference without making it a natural-language query
+IDENTIFIER_WORDS = frozenset("clause clauses section paragraph para article appendix no".split())
+
+
+def is_identifier_query(query: str) -> bool:
+    """True when a query only names standards or clauses ("FAS 32", "SS 9 clause 3/1/2")"""
+    remainder = CLAUSE_PATTERN.sub(" ", STANDARD_REF_PATTERN.sub(" ", query))
+    return remainder != query and set(tokenize(remainder)) <= IDENTIFIER_WORDS
+
+
+def reciprocal_rank_fusion(
+    rankings: List[List[str]], k: int = 60
+) -> List[Tuple[str, float]]:
+    """Fuse several ranked id lists into one ranking by reciprocal rank"""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    """In-process BM25 inverted index over the vector store's chunks.
+
+    Chunk texts and metadata are stored with the postings, so lexical
+    retrieval needs neither an embedding call nor a vector store query.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.version = None
+        self.ids = []
+        self.texts = []
+        self.metadatas = []
+        self.doc_lengths = []
+        self.avg_length = 0.0
+        # term -> list of [document index, term frequency]
+        self.postings: Dict[str, List[List[int]]] = {}
+
+    def build(
+        self,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        version: str = None,
+    ) -> "BM25Index":
+        self.version = version
+        self.ids = list(ids)
+        self.texts = list(texts)
+        self.metadatas = [metadata or {} for metadata in metadatas]
+        self.doc_lengths = []
+        self.postings = {}
+
+        for doc_index, text in enumerate(self.texts):
+            tokens = tokenize(text)
+            self.doc_lengths.append(len(tokens))
+            for term, freq in Counter(tokens).items():
+                self.postings.setdefault(term, []).append([doc_index, freq])
+
+        self.avg_length = (
+            sum(self.doc_lengths) / len(self.doc_lengths) if self.doc_lengths else 0.0
+        )
+        return self
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.ids) - df + 0.5) / (df + 0.5))
+
+    def search(
+        self, query: str, k: int = 5, where: Dict[str, Any] = None
+    ) -> List[Tuple[int, float]]:
+        """Top-k (document index, BM25 score) pairs for a query.
+
+        where is a Chroma-style metadata filter applied before scoring.
+        """
+        allowed = None
+        if where:
+            allowed = {
+                doc_index
+                for doc_index, metadata in enumerate(self.metadatas)
+                if matches_where(metadata, where)
+            }
+        scores = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf(term)
+            for doc_index, freq in postings:
+                if allowed is not None and doc_index not in allowed:
+                    continue
+                length_norm = 1 - self.b + self.b * self.doc_lengths[doc_index] / (
+                    self.avg_length or 1
+                )
+                scores[doc_index] = scores.get(doc_index, 0.0) + idf * (
+                    freq * (self.k1 + 1) / (freq + self.k1 * length_norm)
+                )
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:k]
+
+    def covers(self, query: str, hits: List[Tuple[int, float]]) -> bool:
+        """True when the hits together contain every query term"""
+        terms = set(tokenize(query))
+        if not terms or not hits:
+            return False
+        found = set()
+        for doc_index, _ in hits:
+            found.update(terms.intersection(tokenize(self.texts[doc_index])))
+        return found == terms
+
+    def document(self, doc_index: int) -> "Document":
+        # Imported on first use, so importing this module stays cheap
+        from langchain_core.documents import Document
+
+        return Document(
+            page_content=self.texts[doc_index],
+            metadata=dict(self.metadatas[doc_index]),
+            id=self.ids[doc_index],
+        )
+
+    def save(self, path: str):
+        payload = {
+            "k1": self.k1,
+            "b": self.b,
+            "version": self.version,
+            "ids": self.ids,
+            "texts": self.texts,
+            "metadatas": self.metadatas,
+            "doc_lengths": self.doc_lengths,
+            "postings": self.postings,
+        }
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+        index = cls(k1=payload["k1"], b=payload["b"])
+        index.version = payload["version"]
+        index.ids = payload["ids"]
+        index.texts = payload["texts"]
+        index.metadatas = payload["metadatas"]
+        index.doc_lengths = payload["doc_lengths"]
+        index.postings = payload["postings"]
+        index.avg_length = (
+            sum(index.doc_lengths) / len(index.doc_lengths) if index.doc_lengths else 0.0
+        )
+        return index
@@ -0,0 +1,140 @@
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from embedding_cache import CACHE_DIR
+
+CHECKPOINT_PATH = os.path.join(CACHE_DIR, "agent_checkpoints.sqlite3")
+
+
+def _jsonable(value: Any) -> Any:
+    # Documents are hashed by content and metadata, not by object identity
+    if hasattr(value, "page_content"):
+        return {"page_content": value.page_content, "metadata": value.metadata}
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    return value
+
+
+def content_hash(value: Any) -> str:
+    """Stable hash of a prompt template, retrieved context or any JSON-like value"""
+    payload = json.dumps(_jsonable(value), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CheckpointStore:
+    """Per-stage result cache for multi-step LLM pipelines.
+
+    Each stage output is stored under (name, stage, prompt template hash,
+    inputs hash) as soon as it completes, where the inputs are everything
+    the prompt is filled with: retrieved context and upstream stage outputs.
+    A rerun skips every stage whose template and inputs are unchanged, so
+    an interrupted run resumes after its last completed stage and editing
+    one prompt only re-runs that stage and the ones after it.
+    """
+
+    def __init__(self, path: str = CHECKPOINT_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                name TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                template_hash TEXT NOT NULL,
+                inputs_hash TEXT NOT NULL,
+                output TEXT NOT NULL,
+                created REAL NOT NULL,
+                PRIMARY KEY (name, stage, template_hash, inputs_hash)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(
+        self, name: str, stage: str, template_hash: str, inputs_hash: str
+    ) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT output FROM checkpoints WHERE name = ? AND stage = ? "
+                "AND template_hash = ? AND inputs_hash = ?",
+                (name, stage, template_hash, inputs_hash),
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(
+        self, name: str, stage: str, template_hash: str, inputs_hash: str, output: str
+    ):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints "
+                "(name, stage, template_hash, inputs_hash, output, created) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (name, stage, template_hash, inputs_hash, output, time.time()),
+            )
+            self._conn.commit()
+
+    def run_stage(
+        self,
+        name: str,
+        stage: str,
+        template: str,
+        inputs: Dict[str, Any],
+        run: Callable[[Dict[str, Any]], str],
+        output_schema: Optional[Dict[str, Any]] = None,
+        validate: Optional[Callable[[str], Any]] = None,
+    ) -> str:
+        """Return the checkpointed output for a stage, or run(inputs) and store it.
+
+        A structured stage passes the JSON schema of its output, which is
+        hashed with the template so a schema change re-runs the stage, and a
+        validate callable: a checkpoint it raises on counts as a miss.
+        """
+        template_hash = content_hash(template if output_schema is None else [template, output_schema])
+        inputs_hash = content_hash(inputs)
+        output = self.get(name, stage, template_hash, inputs_hash)
+        if output is not None and validate is not None:
+            try:
+                validate(output)
+            except Exception as e:
+                print(f"[{name}] {stage}: discarding invalid checkpoint ({e.__class__.__name__})")
+                output = None
+        if output is not None:
+            self.hits += 1
+            print(f"[{name}] {stage}: reusing checkpoint")
+            return output
+
+        self.misses += 1
+        output = run(inputs)
+        self.put(name, stage, template_hash, inputs_hash, output)
+        return output
+
+    def clear(self, name: Optional[str] = None, stage: Optional[str] = None):
+        """Drop checkpoints, optionally only for one name and/or stage"""
+        query, params = "DELETE FROM checkpoints WHERE 1 = 1", []
+        if name is not None:
+            query += " AND name = ?"
+            params.append(name)
+        if stage is not None:
+            query += " AND stage = ?"
+            params.append(stage)
+        with self._lock:
+            self._conn.execute(query, params)
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM checkpoints").fetchone()
+        return {"entries": entries, "hits": self.hits, "misses": self.misses}
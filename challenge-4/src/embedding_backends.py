@@ -0,0 +1,194 @@
+import os
+import json
+import math
+import zlib
+from collections import Counter
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from embedding_cache import CachedEmbeddings
+from bm25_index import tokenize
+
+BACKEND_RECORD_NAME = "embedding_backend.json"
+
+DEFAULT_MODELS = {
+    "google": "models/embedding-001",
+    "openai": "text-embedding-ada-002",
+    "local": "sentence-transformers/all-MiniLM-L6-v2",
+    # Model name encodes the vector size
+    "hashing": "hashing-1024",
+}
+
+
+class LocalEmbeddings(Embeddings):
+    """Offline sentence-transformers embeddings with batched CPU inference.
+
+    The model is loaded on first use. Set runtime="onnx" to run the model
+    through ONNX Runtime instead of PyTorch (sentence-transformers >= 3.2).
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODELS["local"],
+        batch_size: int = 32,
+        num_threads: Optional[int] = None,
+        runtime: str = "torch",
+        normalize: bool = True,
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        self.runtime = runtime
+        self.normalize = normalize
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+
+            if self.num_threads:
+                import torch
+
+                torch.set_num_threads(self.num_threads)
+
+            kwargs = {"device": "cpu"}
+            if self.runtime != "torch":
+                kwargs["backend"] = self.runtime
+            self._model = SentenceTransformer(self.model_name, **kwargs)
+        return self._model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=self.normalize,
+            show_progress_bar=False,
+        )
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic offline embeddings of hashed word unigrams and bigrams.
+
+    Needs no model download or network, and a text always gets the same
+    vector in every process, so benchmarks can build a real index anywhere.
+    Quality is that of a lexical bag-of-words model.
+    """
+
+    def __init__(self, dimensions: int = 1024):
+        self.dimensions = dimensions
+        # Cache key: vectors of different sizes must not share entries
+        self.model_name = f"hashing-{dimensions}"
+
+    def _embed(self, text: str) -> List[float]:
+        tokens = tokenize(text)
+        terms = Counter(tokens)
+        terms.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+        vector = [0.0] * self.dimensions
+        for term, count in terms.items():
+            # crc32 rather than hash(), which is salted per process
+            h = zlib.crc32(term.encode("utf-8"))
+            sign = 1.0 if h & 0x80000000 else -1.0
+            vector[h % self.dimensions] += sign * (1.0 + math.log(count))
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def default_backend() -> str:
+    """Backend selected by the EMBEDDING_BACKEND environment variable"""
+    return os.getenv("EMBEDDING_BACKEND", "google").lower()
+
+
+def get_embeddings(
+    backend: Optional[str] = None,
+    model: Optional[str] = None,
+    batch_size: int = 32,
+    num_threads: Optional[int] = None,
+    cache: bool = True,
+    **kwargs,
+) -> Embeddings:
+    """Create the embeddings for a backend: google, openai, local or hashing.
+
+    Remote backends call the hosted APIs; local runs a sentence-transformers
+    model on the CPU; hashing is a deterministic stub for benchmarks.
+    Results are wrapped in the shared embedding cache unless cache=False.
+    """
+    backend = (backend or default_backend()).lower()
+    if backend not in DEFAULT_MODELS:
+        raise ValueError(
+            f"Unknown embedding backend '{backend}'. Choose from: {', '.join(DEFAULT_MODELS)}"
+        )
+    model = model or DEFAULT_MODELS[backend]
+
+    if backend == "google":
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        embeddings = GoogleGenerativeAIEmbeddings(model=model, **kwargs)
+    elif backend == "openai":
+        from langchain_openai import OpenAIEmbeddings
+
+        embeddings = OpenAIEmbeddings(model=model, chunk_size=batch_size, **kwargs)
+    elif backend == "hashing":
+        embeddings = HashingEmbeddings(dimensions=int(model.rsplit("-", 1)[1]))
+    else:
+        embeddings = LocalEmbeddings(
+            model_name=model,
+            batch_size=batch_size,
+            num_threads=num_threads,
+            **kwargs,
+        )
+
+    return CachedEmbeddings(embeddings) if cache else embeddings
+
+
+def backend_persist_directory(
+    base_dir: str, backend: Optional[str] = None, default: str = "google"
+) -> str:
+    """Vector store directory for a backend.
+
+    The store built with the default backend keeps its original location;
+    other backends get a suffixed sibling directory since their vectors are
+    not comparable.
+    """
+    backend = (backend or default_backend()).lower()
+    return base_dir if backend == default else f"{base_dir}_{backend}"
+
+
+def check_backend_record(
+    persist_directory: str, backend: Optional[str] = None, model: Optional[str] = None
+):
+    """Record which backend built a vector store, refusing to mix backends.
+
+    Writes embedding_backend.json on first use. Raises ValueError when the
+    store was built with a different backend or model.
+    """
+    backend = (backend or default_backend()).lower()
+    model = model or DEFAULT_MODELS[backend]
+    record_path = os.path.join(persist_directory, BACKEND_RECORD_NAME)
+
+    if os.path.exists(record_path):
+        with open(record_path, "r") as f:
+            record = json.load(f)
+        if record.get("backend") != backend or record.get("model") != model:
+            raise ValueError(
+                f"Vector store at {persist_directory} was built with "
+                f"{record.get('backend')} ({record.get('model')}), "
+                f"not {backend} ({model}). Use a different directory or rebuild it."
+            )
+        return
+
+    os.makedirs(persist_directory, exist_ok=True)
+    with open(record_path, "w") as f:
+        json.dump({"backend": backend, "model": model}, f, indent=2)
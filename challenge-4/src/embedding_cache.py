@@ -0,0 +1,247 @@
+import os
+import inspect
+import sqlite3
+import threading
+import time
+import hashlib
+import unicodedata
+from array import array
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+# Configure paths
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(os.path.dirname(CURRENT_DIR))
+CACHE_DIR = os.path.join(REPO_DIR, "cache")
+EMBEDDING_CACHE_PATH = os.path.join(CACHE_DIR, "embeddings.sqlite3")
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different inputs share a cache entry"""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def embedding_model_name(embeddings: Embeddings) -> str:
+    """Best effort name of the model behind an embeddings object"""
+    for attr in ("model", "model_name"):
+        name = getattr(embeddings, attr, None)
+        if isinstance(name, str) and name:
+            return name
+    return type(embeddings).__name__
+
+
+class EmbeddingCache:
+    """Disk-backed embedding cache with LRU eviction.
+
+    Vectors are stored as float32 blobs in SQLite, keyed on the model name
+    plus the normalized text. The database runs in WAL mode so the QA bot
+    and the notebooks can share one cache file.
+    """
+
+    def __init__(
+        self,
+        path: str = EMBEDDING_CACHE_PATH,
+        max_entries: int = 200_000,
+        max_bytes: int = 512 * 1024 * 1024,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """Cache key for a model/text pair"""
+        payload = f"{model}\x00{normalize_text(text)}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Look up cached vectors, returning None for every miss"""
+        keys = [self.make_key(model, text) for text in texts]
+        found = {}
+        with self._lock:
+            # Stay well below SQLite's bound parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                self._conn.commit()
+
+        vectors = []
+        for key in keys:
+            blob = found.get(key)
+            if blob is None:
+                self.misses += 1
+                vectors.append(None)
+            else:
+                self.hits += 1
+                vectors.append(array("f", blob).tolist())
+        return vectors
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]):
+        """Store vectors and evict the least recently used entries if needed"""
+        now = time.time()
+        rows = []
+        for text, vector in zip(texts, vectors):
+            blob = array("f", vector).tobytes()
+            rows.append((self.make_key(model, text), model, blob, len(blob), now))
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used rows until both size limits hold"""
+        count, total_bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM embeddings"
+        ).fetchone()
+        if count <= self.max_entries and total_bytes <= self.max_bytes:
+            return
+
+        avg_size = total_bytes / count if count else 1
+        excess = max(
+            count - self.max_entries,
+            int((total_bytes - self.max_bytes) / avg_size) + 1,
+        )
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+            (excess,),
+        )
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current cache size"""
+        with self._lock:
+            count, total_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM embeddings"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": count,
+            "bytes": total_bytes,
+        }
+
+    def clear(self):
+        """Remove every cached vector"""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+
+
+_shared_caches = {}
+
+
+def get_embedding_cache(path: str = EMBEDDING_CACHE_PATH) -> EmbeddingCache:
+    """Return the process-wide cache for a path, opening it on first use"""
+    path = os.path.abspath(path)
+    if path not in _shared_caches:
+        _shared_caches[path] = EmbeddingCache(path)
+    return _shared_caches[path]
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that serves repeated texts from an EmbeddingCache.
+
+    Drop-in replacement for the wrapped embeddings wherever LangChain expects
+    an embedding function (Chroma, retrievers, etc.).
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        cache: Optional[EmbeddingCache] = None,
+        model_name: Optional[str] = None,
+    ):
+        self.embeddings = embeddings
+        self.cache = cache or get_embedding_cache()
+        self.model_name = model_name or embedding_model_name(embeddings)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, only sending cache misses to the underlying model"""
+        vectors = self.cache.get_many(self.model_name, texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            computed = self.embeddings.embed_documents(missing_texts)
+            self.cache.put_many(self.model_name, missing_texts, computed)
+            # Round to float32 so hits and misses return identical vectors
+            for i, vector in zip(missing, computed):
+                vectors[i] = array("f", vector).tolist()
+
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query, skipping the model call on a cache hit"""
+        # Query and document embeddings can differ (task type), so keep
+        # them apart in the cache
+        model = f"{self.model_name}:query"
+        cached = self.cache.get_many(model, [text])[0]
+        if cached is not None:
+            return cached
+
+        vector = self.embeddings.embed_query(text)
+        self.cache.put_many(model, [text], [vector])
+        return array("f", vector).tolist()
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries, sending all cache misses in one request"""
+        model = f"{self.model_name}:query"
+        vectors = self.cache.get_many(model, texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            computed = self._embed_queries(missing_texts)
+            self.cache.put_many(model, missing_texts, computed)
+            for i, vector in zip(missing, computed):
+                vectors[i] = array("f", vector).tolist()
+
+        return vectors
+
+    def _embed_queries(self, texts: List[str]) -> List[List[float]]:
+        # Gemini embeds queries with a different task type than documents
+        parameters = inspect.signature(self.embeddings.embed_documents).parameters
+        if "task_type" in parameters:
+            return self.embeddings.embed_documents(texts, task_type="retrieval_query")
+        # Other backends embed queries and documents the same way
+        return self.embeddings.embed_documents(texts)
@@ -0,0 +1,282 @@
+import os
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Tuple
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from pdf_extraction import file_sha256, load_pdf_documents
+from standard_refs import standard_metadata
+
+MANIFEST_NAME = "ingest_manifest.json"
+SUPPORTED_EXTENSIONS = (".pdf", ".txt")
+
+
+def load_file(file_path: str) -> List[Document]:
+    """Load one standard into page Documents.
+
+    Module level so it can run in a worker process.
+    """
+    filename = os.path.basename(file_path)
+    if filename.lower().endswith(".pdf"):
+        # Served from the page cache when the file was parsed before
+        pages = load_pdf_documents(file_path)
+    else:
+        # Imported here to keep worker start-up light
+        from langchain_community.document_loaders import TextLoader
+
+        pages = TextLoader(file_path).load()
+
+    # Standard type/number let retrieval filter inside Chroma
+    metadata = standard_metadata(filename)
+    for page in pages:
+        page.metadata["source"] = filename
+        page.metadata.update(metadata)
+    return pages
+
+
+class IngestionEngine:
+    """Incrementally keeps a Chroma collection in sync with the data directory.
+
+    PDFs are parsed in a process pool and embedded in concurrent batches with
+    a bounded number of in-flight requests. A manifest of file content hashes
+    stored next to the vector store records which chunk ids belong to which
+    file, so adding or changing one standard only re-embeds that file.
+    """
+
+    def __init__(
+        self,
+        vectorstore,
+        embeddings,
+        data_dir: str,
+        persist_directory: str,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        batch_size: int = 64,
+        max_in_flight: int = 4,
+        max_workers: int = None,
+    ):
+        self.vectorstore = vectorstore
+        self.embeddings = embeddings
+        self.data_dir = data_dir
+        self.persist_directory = persist_directory
+        self.manifest_path = os.path.join(persist_directory, MANIFEST_NAME)
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.max_workers = max_workers
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap
+        )
+
+    def discover_files(self) -> List[str]:
+        """List the FAS and SS files in the data directory"""
+        if not os.path.exists(self.data_dir):
+            raise FileNotFoundError(f"Data directory not found: {self.data_dir}")
+
+        return sorted(
+            f
+            for f in os.listdir(self.data_dir)
+            if f.upper().startswith(("FAS", "SS"))
+            and f.lower().endswith(SUPPORTED_EXTENSIONS)
+            and os.path.isfile(os.path.join(self.data_dir, f))
+        )
+
+    def load_manifest(self) -> Dict[str, Any]:
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path, "r") as f:
+            return json.load(f)
+
+    def manifest_fingerprint(self) -> str:
+        """Hash of the manifest file, which changes with any chunk or metadata change"""
+        if not os.path.exists(self.manifest_path):
+            return ""
+        with open(self.manifest_path, "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()
+
+    def save_manifest(self, manifest: Dict[str, Any]):
+        os.makedirs(self.persist_directory, exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _adopt_existing(self, hashes: Dict[str, str]) -> Dict[str, Any]:
+        """Build a manifest for a collection indexed before manifests existed.
+
+        Existing chunks are grouped by the file name in their source metadata
+        and assumed to match the current file contents.
+        """
+        existing = self.vectorstore._collection.get(include=["metadatas"])
+        ids_by_file = {}
+        for chunk_id, metadata in zip(existing["ids"], existing["metadatas"]):
+            source = os.path.basename(str((metadata or {}).get("source", "")))
+            ids_by_file.setdefault(source, []).append(chunk_id)
+
+        manifest = {
+            filename: {"sha256": hashes[filename], "chunk_ids": ids_by_file[filename]}
+            for filename in hashes
+            if filename in ids_by_file
+        }
+        print(f"Adopted existing vector database into manifest ({len(manifest)} files)")
+        self.save_manifest(manifest)
+        return manifest
+
+    def _backfill_standard_metadata(
+        self, manifest: Dict[str, Any], skip: List[str]
+    ) -> List[str]:
+        """Tag chunks ingested with older or no standard metadata, without re-embedding"""
+        stale = [
+            f
+            for f, entry in manifest.items()
+            if f not in skip
+            and any(entry.get(key) != value for key, value in standard_metadata(f).items())
+        ]
+        if not stale:
+            return []
+
+        for filename in stale:
+            entry = manifest[filename]
+            metadata = standard_metadata(filename)
+            if entry["chunk_ids"]:
+                existing = self.vectorstore._collection.get(
+                    ids=entry["chunk_ids"], include=["metadatas"]
+                )
+                self.vectorstore._collection.update(
+                    ids=existing["ids"],
+                    metadatas=[
+                        {**(old or {}), **metadata} for old in existing["metadatas"]
+                    ],
+                )
+            entry.update(metadata)
+        self.save_manifest(manifest)
+        print(f"Added standard metadata to {len(stale)} previously ingested files")
+        return stale
+
+    def _parse(self, filenames: List[str]) -> Dict[str, List[Document]]:
+        """Parse files in a process pool"""
+        pages_by_file = {}
+        paths = [os.path.join(self.data_dir, f) for f in filenames]
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(load_file, path): os.path.basename(path) for path in paths}
+            for future in as_completed(futures):
+                filename = futures[future]
+                try:
+                    pages_by_file[filename] = future.result()
+                    print(f"Loaded {filename} - {len(pages_by_file[filename])} pages")
+                except Exception as e:
+                    print(f"Error loading {filename}: {str(e)}")
+        return pages_by_file
+
+    def _embed_and_store(
+        self,
+        chunks_by_file: Dict[str, Tuple[List[str], List[Document]]],
+        hashes: Dict[str, str],
+        manifest: Dict[str, Any],
+    ) -> int:
+        """Embed chunks in concurrent batches and write them to the store.
+
+        A file is recorded in the manifest as soon as all of its batches are
+        stored, so an interrupted sync resumes with the remaining files.
+        """
+        batches = []
+        remaining = {}
+        for filename, (ids, chunks) in chunks_by_file.items():
+            remaining[filename] = 0
+            for start in range(0, len(chunks), self.batch_size):
+                batches.append(
+                    (
+                        filename,
+                        ids[start : start + self.batch_size],
+                        chunks[start : start + self.batch_size],
+                    )
+                )
+                remaining[filename] += 1
+
+        def embed(batch):
+            _, _, chunks = batch
+            return self.embeddings.embed_documents([c.page_content for c in chunks])
+
+        embedded = 0
+        # The pool size bounds the number of embedding requests in flight
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            futures = {pool.submit(embed, batch): batch for batch in batches}
+            for future in as_completed(futures):
+                filename, ids, chunks = futures[future]
+                vectors = future.result()
+                self.vectorstore._collection.upsert(
+                    ids=ids,
+                    embeddings=vectors,
+                    metadatas=[c.metadata for c in chunks],
+                    documents=[c.page_content for c in chunks],
+                )
+                embedded += len(chunks)
+
+                remaining[filename] -= 1
+                if remaining[filename] == 0:
+                    manifest[filename] = {
+                        "sha256": hashes[filename],
+                        "chunk_ids": chunks_by_file[filename][0],
+                        **standard_metadata(filename),
+                    }
+                    self.save_manifest(manifest)
+        return embedded
+
+    def sync(self) -> Dict[str, Any]:
+        """Bring the vector store up to date with the data directory"""
+        filenames = self.discover_files()
+        print(f"Found {len(filenames)} FAS/SS files: {', '.join(filenames)}")
+        hashes = {f: file_sha256(os.path.join(self.data_dir, f)) for f in filenames}
+
+        manifest = self.load_manifest()
+        if not manifest and self.vectorstore._collection.count() > 0:
+            manifest = self._adopt_existing(hashes)
+
+        changed = [f for f in filenames if manifest.get(f, {}).get("sha256") != hashes[f]]
+        removed = [f for f in manifest if f not in hashes]
+
+        # Drop chunks of changed and deleted files before re-embedding
+        stale_ids = [
+            chunk_id
+            for f in changed + removed
+            if f in manifest
+            for chunk_id in manifest[f]["chunk_ids"]
+        ]
+        if stale_ids:
+            self.vectorstore.delete(ids=stale_ids)
+        for f in removed:
+            del manifest[f]
+        if removed:
+            self.save_manifest(manifest)
+        metadata_updated = self._backfill_standard_metadata(manifest, skip=changed)
+
+        embedded = 0
+        if changed:
+            print(f"Ingesting {len(changed)} new or changed files...")
+            chunks_by_file = {}
+            for filename, pages in self._parse(changed).items():
+                chunks = self.splitter.split_documents(pages)
+                if not chunks:
+                    print(f"Warning: no text chunks were created from {filename}")
+                    manifest[filename] = {
+                        "sha256": hashes[filename],
+                        "chunk_ids": [],
+                        **standard_metadata(filename),
+                    }
+                    self.save_manifest(manifest)
+                    continue
+                # Content-derived ids make re-ingestion of unchanged text idempotent
+                ids = [f"{hashes[filename][:16]}-{i}" for i in range(len(chunks))]
+                chunks_by_file[filename] = (ids, chunks)
+            embedded = self._embed_and_store(chunks_by_file, hashes, manifest)
+            print(f"Embedded {embedded} chunks")
+
+        return {
+            "changed": changed,
+            "removed": removed,
+            "metadata_updated": metadata_updated,
+            "unchanged": len(filenames) - len(changed),
+            "chunks_embedded": embedded,
+        }
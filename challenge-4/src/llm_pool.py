@@ -0,0 +1,229 @@
+import os
+import asyncio
+import weakref
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+DEFAULT_MODELS = {
+    "google": "gemini-1.5-pro",
+    "openai": "gpt-4o-mini",
+}
+# Completion (non-chat) models, e.g. for challenge-1's OpenAI() extraction prompt
+DEFAULT_COMPLETION_MODELS = {
+    "openai": "gpt-3.5-turbo-instruct",
+}
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    """Connection and concurrency settings shared by every pooled client.
+
+    max_connections / max_keepalive_connections / keepalive_expiry size the
+    HTTP connection pool of OpenAI-compatible clients, so repeated calls reuse
+    warm connections. Gemini clients keep one long-lived gRPC channel per
+    client. max_concurrency bounds in-flight calls in Runnable.batch() via
+    LLMPool.run_config().
+    """
+
+    max_connections: int = 32
+    max_keepalive_connections: int = 16
+    keepalive_expiry: float = 60.0
+    timeout: float = 120.0
+    max_retries: int = 2
+    max_concurrency: int = 8
+
+
+class _LoopTransport:
+    """httpx async transport with one connection pool per event loop.
+
+    Pooled connections belong to the loop that opened them, so a shared
+    AsyncClient used from a later asyncio.run() would hit dead connections.
+    """
+
+    def __init__(self, **options):
+        self._options = options
+        self._transports = weakref.WeakKeyDictionary()
+
+    def _transport(self):
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        transport = self._transports.get(loop)
+        if transport is None:
+            transport = self._transports[loop] = httpx.AsyncHTTPTransport(**self._options)
+        return transport
+
+    async def handle_async_request(self, request):
+        return await self._transport().handle_async_request(request)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        transport = self._transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+
+def default_provider() -> str:
+    """Provider selected by the LLM_PROVIDER environment variable"""
+    return os.getenv("LLM_PROVIDER", "google").lower()
+
+
+class LLMPool:
+    """Registry of reusable LLM clients.
+
+    Clients are created once per (provider, kind, model, temperature, options)
+    and shared across calls and threads, together with their HTTP sessions.
+    Callers must not mutate a pooled client; ask the pool for one with the
+    settings they need instead.
+    """
+
+    def __init__(self, settings: Optional[PoolSettings] = None):
+        self.settings = settings or PoolSettings()
+        self._clients: Dict[tuple, Any] = {}
+        self._http_clients: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _openai_http_clients(self, base_url: Optional[str]):
+        """Shared keep-alive httpx clients per base URL"""
+        import httpx
+
+        key = base_url or ""
+        if key not in self._http_clients:
+            limits = httpx.Limits(
+                max_connections=self.settings.max_connections,
+                max_keepalive_connections=self.settings.max_keepalive_connections,
+                keepalive_expiry=self.settings.keepalive_expiry,
+            )
+            timeout = httpx.Timeout(self.settings.timeout)
+            self._http_clients[key] = (
+                httpx.Client(limits=limits, timeout=timeout),
+                httpx.AsyncClient(transport=_LoopTransport(limits=limits), timeout=timeout),
+            )
+        return self._http_clients[key]
+
+    def _create(self, provider: str, kind: str, model: str, temperature: float, options):
+        if provider == "google":
+            if kind != "chat":
+                raise ValueError("The google provider only offers chat models")
+            from langchain_google_genai import ChatGoogleGenerativeAI
+
+            return ChatGoogleGenerativeAI(
+                model=model,
+                temperature=temperature,
+                timeout=self.settings.timeout,
+                max_retries=self.settings.max_retries,
+                **options,
+            )
+
+        if provider == "openai":
+            from langchain_openai import ChatOpenAI, OpenAI
+
+            http_client, http_async_client = self._openai_http_clients(
+                options.get("base_url")
+            )
+            cls = ChatOpenAI if kind == "chat" else OpenAI
+            return cls(
+                model=model,
+                temperature=temperature,
+                max_retries=self.settings.max_retries,
+                http_client=http_client,
+                http_async_client=http_async_client,
+                **options,
+            )
+
+        raise ValueError(
+            f"Unknown LLM provider '{provider}'. Choose from: {', '.join(DEFAULT_MODELS)}"
+        )
+
+    def get(
+        self,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        temperature: float = 0.0,
+        kind: str = "chat",
+        **options,
+    ):
+        """Shared client for a provider ("google" or "openai") and model.
+
+        kind is "chat" for chat models or "completion" for text completion
+        models. Extra options (e.g. base_url for an OpenAI-compatible server,
+        convert_system_message_to_human for Gemini) become part of the key.
+        """
+        provider = (provider or default_provider()).lower()
+        defaults = DEFAULT_MODELS if kind == "chat" else DEFAULT_COMPLETION_MODELS
+        model = model or defaults.get(provider)
+        key = (provider, kind, model, float(temperature), tuple(sorted(options.items())))
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._create(provider, kind, model, temperature, options)
+                self._clients[key] = client
+        return client
+
+    def run_config(self, **config) -> Dict[str, Any]:
+        """Runnable config that applies the pool's concurrency limit to batch()"""
+        return {"max_concurrency": self.settings.max_concurrency, **config}
+
+    def close(self):
+        """Drop pooled clients and close their HTTP sessions"""
+        with self._lock:
+            for http_client, _ in self._http_clients.values():
+                http_client.close()
+            self._http_clients.clear()
+            self._clients.clear()
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_pool() -> LLMPool:
+    """Process-wide LLM pool"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = LLMPool()
+        return _default_pool
+
+
+def configure_pool(settings: PoolSettings) -> LLMPool:
+    """Replace the process-wide pool with one using new settings"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is not None:
+            _default_pool.close()
+        _default_pool = LLMPool(settings)
+        return _default_pool
+
+
+def get_llm(
+    provider: Optional[str] = None,
+    model: Optional[str] = None,
+    temperature: float = 0.0,
+    kind: str = "chat",
+    **options,
+):
+    """Shared LLM client from the process-wide pool"""
+    return get_pool().get(provider, model, temperature, kind, **options)
+
+
+@lru_cache(maxsize=256)
+def get_prompt(template: str, chat: bool = False):
+    """Compiled PromptTemplate (or ChatPromptTemplate) for a template string.
+
+    Templates are parsed once and reused; prompt templates are immutable, so
+    sharing them across calls and threads is safe.
+    """
+    from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
+
+    if chat:
+        return ChatPromptTemplate.from_template(template)
+    return PromptTemplate.from_template(template)
@@ -0,0 +1,333 @@
+import sys
+import json
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+# Quantiles reported for every summary metric
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Structured log events, one JSON object per line (see enable_json_logs)
+logger = logging.getLogger("aaoifi.metrics")
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def quantile(sorted_values: List[float], q: float) -> float:
+    """Linearly interpolated quantile of sorted values"""
+    if not sorted_values:
+        return 0.0
+    position = q * (len(sorted_values) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    fraction = position - lower
+    return sorted_values[lower] * (1 - fraction) + sorted_values[upper] * fraction
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token) for calls that report no usage"""
+    return max(1, round(len(text) / 4)) if text else 0
+
+
+def usage_tokens(message) -> Optional[Tuple[int, int]]:
+    """(input, output) tokens reported on a LangChain message, if any"""
+    usage = getattr(message, "usage_metadata", None)
+    if not usage:
+        return None
+    return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+
+
+class Summary:
+    """Count and sum of all observations, with quantiles over a recent window"""
+
+    def __init__(self, window: int = 2048):
+        self.count = 0
+        self.sum = 0.0
+        self.values = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.values.append(value)
+
+    def snapshot(self) -> Dict[str, float]:
+        values = sorted(self.values)
+        snapshot = {"count": self.count, "sum": self.sum}
+        for q in QUANTILES:
+            snapshot[f"p{int(q * 100)}"] = quantile(values, q)
+        return snapshot
+
+
+class MetricsRegistry:
+    """Thread-safe counters, gauges and latency summaries.
+
+    Metrics are identified by name and labels, e.g.
+    observe("qa_stage_seconds", 0.12, stage="embedding"). Export them with
+    to_prometheus() (text exposition format), to_json(), or serve_metrics().
+    """
+
+    def __init__(self, namespace: str = "aaoifi", window: int = 2048):
+        self.namespace = namespace
+        self.window = window
+        self._lock = threading.Lock()
+        self._descriptions: Dict[str, str] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._summaries: Dict[str, Dict[LabelKey, Summary]] = {}
+
+    def describe(self, name: str, description: str):
+        """HELP text shown for a metric in the Prometheus output"""
+        self._descriptions[name] = description
+
+    def inc(self, name: str, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._summaries.setdefault(name, {})
+            if key not in series:
+                series[key] = Summary(self.window)
+            series[key].observe(value)
+
+    @contextmanager
+    def timer(self, stage: str, name: str = "stage_seconds", **labels):
+        """Observe the seconds spent in a with block as name{stage=...}"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, stage=stage, **labels)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """All metrics as plain data, for JSON dumps"""
+        with self._lock:
+            return {
+                "counters": {
+                    name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                    for name, series in self._counters.items()
+                },
+                "gauges": {
+                    name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                    for name, series in self._gauges.items()
+                },
+                "summaries": {
+                    name: [{"labels": dict(key), **summary.snapshot()} for key, summary in series.items()]
+                    for name, series in self._summaries.items()
+                },
+            }
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def to_prometheus(self) -> str:
+        """Metrics in the Prometheus text exposition format"""
+        lines = []
+
+        def header(name, metric_type):
+            full_name = f"{self.namespace}_{name}"
+            if name in self._descriptions:
+                lines.append(f"# HELP {full_name} {self._descriptions[name]}")
+            lines.append(f"# TYPE {full_name} {metric_type}")
+            return full_name
+
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                full_name = header(name, "counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{full_name}{_format_labels(key)} {value:g}")
+            for name, series in sorted(self._gauges.items()):
+                full_name = header(name, "gauge")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{full_name}{_format_labels(key)} {value:g}")
+            for name, series in sorted(self._summaries.items()):
+                full_name = header(name, "summary")
+                for key, summary in sorted(series.items()):
+                    snapshot = summary.snapshot()
+                    for q in QUANTILES:
+                        labels = _format_labels(key, (("quantile", str(q)),))
+                        lines.append(f"{full_name}{labels} {snapshot[f'p{int(q * 100)}']:g}")
+                    lines.append(f"{full_name}_sum{_format_labels(key)} {snapshot['sum']:g}")
+                    lines.append(f"{full_name}_count{_format_labels(key)} {snapshot['count']}")
+        return "\n".join(lines) + "\n"
+
+    def report(self) -> str:
+        """Short human readable summary: counters and p50/p95/p99 of each summary"""
+        snapshot = self.snapshot()
+        lines = []
+        for kind in ("counters", "gauges"):
+            for name, series in sorted(snapshot[kind].items()):
+                for item in series:
+                    labels = ", ".join(f"{k}={v}" for k, v in sorted(item["labels"].items()))
+                    lines.append(f"{name}[{labels}]: {item['value']:g}")
+        for name, series in sorted(snapshot["summaries"].items()):
+            for item in series:
+                labels = ", ".join(f"{k}={v}" for k, v in sorted(item["labels"].items()))
+                lines.append(
+                    f"{name}[{labels}]: n={item['count']} p50={item['p50']:.4g} "
+                    f"p95={item['p95']:.4g} p99={item['p99']:.4g}"
+                )
+        return "\n".join(lines)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._summaries.clear()
+
+
+def log_event(event: str, **fields):
+    """Emit a structured log event as one JSON object"""
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({"event": event, "time": time.time(), **fields}, default=str))
+
+
+def enable_json_logs(stream=None, level: int = logging.INFO):
+    """Write metrics log events as JSON lines to stream (stderr by default)"""
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    return handler
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Process-wide metrics registry shared by the QA bot and the notebooks"""
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = MetricsRegistry()
+        return _default_registry
+
+
+def serve_metrics(
+    port: int = 9464, host: str = "127.0.0.1", registry: Optional[MetricsRegistry] = None
+) -> "ThreadingHTTPServer":
+    """Serve /metrics (Prometheus text) and /metrics.json from a daemon thread"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    registry = registry or get_metrics()
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            if path == "/metrics":
+                body = registry.to_prometheus().encode("utf-8")
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            elif path == "/metrics.json":
+                body = registry.to_json().encode("utf-8")
+                content_type = "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+def metrics_callback(pipeline: str, registry: Optional[MetricsRegistry] = None):
+    """LangChain callback handler recording LLM latency, tokens and errors.
+
+    Pass it in a chain's config, e.g.
+    chain.batch(inputs, config=get_pool().run_config(callbacks=[metrics_callback("ledger")])),
+    to get llm_seconds, llm_tokens_total and llm_errors_total labelled with
+    the pipeline name.
+    """
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    registry = registry or get_metrics()
+    registry.describe("llm_seconds", "Seconds per LLM call, by pipeline")
+    registry.describe("llm_tokens_total", "LLM input and output tokens reported by the provider")
+    registry.describe("llm_errors_total", "Failed LLM calls, by pipeline")
+
+    class MetricsCallbackHandler(BaseCallbackHandler):
+        def __init__(self):
+            self._starts: Dict[Any, float] = {}
+            self._lock = threading.Lock()
+
+        def _start(self, run_id):
+            with self._lock:
+                self._starts[run_id] = time.perf_counter()
+
+        def _stop(self, run_id) -> Optional[float]:
+            with self._lock:
+                start = self._starts.pop(run_id, None)
+            return None if start is None else time.perf_counter() - start
+
+        def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+            self._start(run_id)
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+            self._start(run_id)
+
+        def on_llm_end(self, response, *, run_id, **kwargs):
+            seconds = self._stop(run_id)
+            if seconds is not None:
+                registry.observe("llm_seconds", seconds, pipeline=pipeline)
+            input_tokens = output_tokens = 0
+            for generations in response.generations:
+                for generation in generations:
+                    usage = usage_tokens(getattr(generation, "message", None))
+                    if usage:
+                        input_tokens += usage[0]
+                        output_tokens += usage[1]
+            if not (input_tokens or output_tokens):
+                # Completion models report usage in llm_output instead
+                token_usage = (response.llm_output or {}).get("token_usage") or {}
+                input_tokens = token_usage.get("prompt_tokens", 0)
+                output_tokens = token_usage.get("completion_tokens", 0)
+            registry.inc("llm_tokens_total", input_tokens, pipeline=pipeline, kind="input")
+            registry.inc("llm_tokens_total", output_tokens, pipeline=pipeline, kind="output")
+            log_event(
+                "llm_call",
+                pipeline=pipeline,
+                seconds=seconds,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+            )
+
+        def on_llm_error(self, error, *, run_id, **kwargs):
+            self._stop(run_id)
+            registry.inc("llm_errors_total", pipeline=pipeline)
+            log_event("llm_error", pipeline=pipeline, error=str(error))
+
+    return MetricsCallbackHandler()
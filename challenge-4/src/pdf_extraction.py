@@ -0,0 +1,118 @@
+import os
+import gzip
+import json
+import hashlib
+from typing import List, Dict, Any
+
+from langchain_core.documents import Document
+
+from embedding_cache import CACHE_DIR
+
+# Bump when extraction output changes so stale cache files are ignored
+EXTRACTOR_VERSION = 1
+PDF_CACHE_DIR = os.path.join(CACHE_DIR, "pdf_text")
+
+
+def file_sha256(path: str) -> str:
+    """Content hash of a file"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _extract_with_pdfplumber(pdf_path: str) -> List[Dict[str, Any]]:
+    import pdfplumber
+
+    pages = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for i, page in enumerate(pdf.pages):
+            pages.append(
+                {
+                    "page": i,
+                    "text": page.extract_text() or "",
+                    "width": float(page.width),
+                    "height": float(page.height),
+                }
+            )
+    return pages
+
+
+def _extract_with_pypdf(pdf_path: str) -> List[Dict[str, Any]]:
+    from pypdf import PdfReader
+
+    pages = []
+    for i, page in enumerate(PdfReader(pdf_path).pages):
+        pages.append(
+            {
+                "page": i,
+                "text": page.extract_text() or "",
+                "width": float(page.mediabox.width),
+                "height": float(page.mediabox.height),
+            }
+        )
+    return pages
+
+
+EXTRACTORS = {
+    "pdfplumber": _extract_with_pdfplumber,
+    "pypdf": _extract_with_pypdf,
+}
+
+
+def cache_path(pdf_path: str, extractor: str, cache_dir: str = PDF_CACHE_DIR) -> str:
+    """Location of the page cache for a file, keyed by content hash and extractor version"""
+    digest = file_sha256(pdf_path)
+    return os.path.join(
+        cache_dir, f"{digest[:32]}-{extractor}-v{EXTRACTOR_VERSION}.jsonl.gz"
+    )
+
+
+def extract_pages(
+    pdf_path: str, extractor: str = "pdfplumber", cache_dir: str = PDF_CACHE_DIR
+) -> List[Dict[str, Any]]:
+    """Per-page text and page size of a PDF.
+
+    Results are cached on disk as gzipped JSONL (one line per page), so a PDF
+    is only parsed once per extractor version.
+    """
+    if extractor not in EXTRACTORS:
+        raise ValueError(
+            f"Unknown extractor '{extractor}'. Choose from: {', '.join(EXTRACTORS)}"
+        )
+
+    path = cache_path(pdf_path, extractor, cache_dir)
+    if os.path.exists(path):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    pages = EXTRACTORS[extractor](pdf_path)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        for page in pages:
+            f.write(json.dumps(page, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, path)
+    return pages
+
+
+def extract_pdf_text(pdf_path: str, extractor: str = "pdfplumber") -> str:
+    """Full text of a PDF with one newline after every non-empty page"""
+    return "".join(
+        page["text"] + "\n"
+        for page in extract_pages(pdf_path, extractor)
+        if page["text"]
+    )
+
+
+def load_pdf_documents(pdf_path: str, extractor: str = "pypdf") -> List[Document]:
+    """Page Documents of a PDF, shaped like PyPDFLoader(pdf_path).load()"""
+    return [
+        Document(
+            page_content=page["text"],
+            metadata={"source": pdf_path, "page": page["page"]},
+        )
+        for page in extract_pages(pdf_path, extractor)
+    ]
@@ -0,0 +1,366 @@
+import os
+import gzip
+import json
+import mmap
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+from standard_centroids import collection_fingerprint
+from standard_refs import matches_where
+
+QUANTIZED_INDEX_NAME = "quantized_index"
+
+# Rows converted from int8 to float32 at a time while scanning
+SCAN_BLOCK_ROWS = 1024
+
+
+def collection_space(collection) -> str:
+    """Distance space of a Chroma collection: l2 (default), cosine or ip"""
+    configuration = getattr(collection, "configuration", None) or {}
+    for key in ("hnsw", "spann"):
+        space = (configuration.get(key) or {}).get("space")
+        if space:
+            return space
+    return (collection.metadata or {}).get("hnsw:space", "l2")
+
+
+def _distances(dots: np.ndarray, query_norms: np.ndarray, row_norms: np.ndarray, space: str) -> np.ndarray:
+    """Chroma distances (queries x rows) from inner products and vector norms"""
+    if space == "cosine":
+        denominator = np.outer(query_norms, row_norms)
+        return 1.0 - dots / np.where(denominator == 0, 1, denominator)
+    if space == "ip":
+        return 1.0 - dots
+    # Chroma's l2 is the squared Euclidean distance
+    return query_norms[:, None] ** 2 + row_norms[None, :] ** 2 - 2.0 * dots
+
+
+class QuantizedIndex:
+    """int8 vectors for scanning and float32 vectors for reranking, memory-mapped.
+
+    Each vector is stored as int8 codes with one float32 scale (symmetric,
+    per row), a quarter of the float32 size. A search scans the codes for
+    oversample x k candidates and reranks them exactly with the float32
+    vectors. Chunk texts are kept alongside, so a search never touches
+    Chroma. Codes, vectors and texts are memory-mapped read-only: replicas
+    on one node share them through the page cache, and only the float32
+    rows and texts of the hits are ever read.
+    """
+
+    def __init__(self, oversample: int = 4):
+        self.oversample = oversample
+        self.version = None
+        self.space = "l2"
+        self.ids: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self.scales = np.zeros(0, dtype=np.float32)
+        self.norms = np.zeros(0, dtype=np.float32)
+        self.codes = np.zeros((0, 0), dtype=np.int8)
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.text_offsets = np.zeros(1, dtype=np.int64)
+        self.texts = b""
+
+    def __len__(self):
+        return len(self.ids)
+
+    def build(
+        self,
+        ids: List[str],
+        embeddings: Iterable[List[float]],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        version: str = None,
+        space: str = "l2",
+    ) -> "QuantizedIndex":
+        vectors = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        self.codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        self.scales = scales.astype(np.float32)
+        self.norms = np.linalg.norm(vectors, axis=1).astype(np.float32)
+        self.vectors = vectors
+
+        encoded = [(text or "").encode("utf-8") for text in texts]
+        self.text_offsets = np.concatenate([[0], np.cumsum([len(text) for text in encoded])]).astype(np.int64)
+        self.texts = b"".join(encoded)
+        self.ids = list(ids)
+        self.metadatas = [metadata or {} for metadata in metadatas]
+        self.version = version
+        self.space = space
+        return self
+
+    def text(self, row: int) -> str:
+        return bytes(self.texts[self.text_offsets[row]:self.text_offsets[row + 1]]).decode("utf-8")
+
+    def document(self, row: int) -> Document:
+        return Document(page_content=self.text(row), metadata=self.metadatas[row], id=self.ids[row])
+
+    def matching_rows(self, where: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Rows whose metadata matches a Chroma where clause, None for all rows"""
+        if not where:
+            return None
+        return np.flatnonzero([matches_where(metadata, where) for metadata in self.metadatas])
+
+    def search_batch(
+        self,
+        query_embeddings: List[List[float]],
+        k: int,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Tuple[int, float]]]:
+        """(row, distance) of the k nearest rows for each query, nearest first"""
+        rows = self.matching_rows(where)
+        count = len(self.ids) if rows is None else len(rows)
+        if not count or not len(query_embeddings):
+            return [[] for _ in query_embeddings]
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        query_norms = np.linalg.norm(queries, axis=1)
+
+        # Approximate inner products from the int8 codes, block by block
+        dots = np.empty((len(queries), count), dtype=np.float32)
+        for start in range(0, count, SCAN_BLOCK_ROWS):
+            block = slice(start, start + SCAN_BLOCK_ROWS)
+            block_rows = block if rows is None else rows[block]
+            codes = np.asarray(self.codes[block_rows], dtype=np.float32)
+            dots[:, block] = (queries @ codes.T) * self.scales[block_rows]
+        row_ids = np.arange(count) if rows is None else rows
+        approximate = _distances(dots, query_norms, self.norms[row_ids], self.space)
+
+        candidates = min(count, max(k * self.oversample, k))
+        results = []
+        for query, query_norm, distances in zip(queries, query_norms, approximate):
+            nearest = np.argpartition(distances, candidates - 1)[:candidates]
+            # Exact rerank; sorted rows read the memory map in file order
+            candidate_rows = np.sort(row_ids[nearest])
+            vectors = np.asarray(self.vectors[candidate_rows], dtype=np.float32)
+            exact = _distances(
+                (vectors @ query)[None, :],
+                np.asarray([query_norm]),
+                self.norms[candidate_rows],
+                self.space,
+            )[0]
+            order = np.argsort(exact, kind="stable")[:k]
+            results.append([(int(candidate_rows[i]), float(exact[i])) for i in order])
+        return results
+
+    @staticmethod
+    def _paths(path: str) -> Dict[str, str]:
+        return {
+            "manifest": f"{path}.json.gz",
+            "arrays": f"{path}.npz",
+            "codes": f"{path}.codes.npy",
+            "vectors": f"{path}.vectors.npy",
+            "texts": f"{path}.texts.bin",
+        }
+
+    def save(self, path: str):
+        """Write the index next to the store; the large parts load memory-mapped"""
+        paths = self._paths(path)
+        for name in ("codes", "vectors"):
+            tmp_path = f"{paths[name]}.tmp.npy"
+            np.save(tmp_path, getattr(self, name))
+            os.replace(tmp_path, paths[name])
+        tmp_path = f"{paths['arrays']}.tmp.npz"
+        np.savez(tmp_path, scales=self.scales, norms=self.norms, text_offsets=self.text_offsets)
+        os.replace(tmp_path, paths["arrays"])
+        with open(f"{paths['texts']}.tmp", "wb") as f:
+            f.write(self.texts)
+        os.replace(f"{paths['texts']}.tmp", paths["texts"])
+
+        # The manifest is written last, so a partial save never loads
+        tmp_path = f"{paths['manifest']}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": self.version,
+                    "space": self.space,
+                    "ids": self.ids,
+                    "metadatas": self.metadatas,
+                },
+                f,
+            )
+        os.replace(tmp_path, paths["manifest"])
+
+    @classmethod
+    def load(cls, path: str, oversample: int = 4) -> Optional["QuantizedIndex"]:
+        """Index saved at path, or None when it is missing or incomplete"""
+        paths = cls._paths(path)
+        if not all(os.path.exists(p) for p in paths.values()):
+            return None
+        index = cls(oversample)
+        with gzip.open(paths["manifest"], "rt", encoding="utf-8") as f:
+            manifest = json.load(f)
+        index.version = manifest["version"]
+        index.space = manifest["space"]
+        index.ids = manifest["ids"]
+        index.metadatas = manifest["metadatas"]
+        with np.load(paths["arrays"]) as arrays:
+            index.scales = arrays["scales"]
+            index.norms = arrays["norms"]
+            index.text_offsets = arrays["text_offsets"]
+        index.codes = np.load(paths["codes"], mmap_mode="r")
+        index.vectors = np.load(paths["vectors"], mmap_mode="r")
+        if os.path.getsize(paths["texts"]):
+            with open(paths["texts"], "rb") as f:
+                index.texts = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if not (len(index.codes) == len(index.vectors) == len(index.ids) == len(index.text_offsets) - 1):
+            return None
+        return index
+
+    @classmethod
+    def remove(cls, path: str):
+        for p in cls._paths(path).values():
+            if os.path.exists(p):
+                os.remove(p)
+
+
+class QuantizedVectorStore(VectorStore):
+    """Chroma store whose searches are served from a QuantizedIndex.
+
+    Chroma stays the source of truth: ingestion writes to it, and the index
+    is rebuilt from its stored embeddings, texts and metadata when version()
+    changes. Searches, filters and chunk texts come from the index alone, so
+    a replica that loads a saved index never loads Chroma's vectors.
+    """
+
+    def __init__(
+        self,
+        chroma,
+        path: str,
+        version: Optional[Callable[[], str]] = None,
+        oversample: int = 4,
+    ):
+        self.chroma = chroma
+        self.path = path
+        # Fingerprint of the collection contents; reading Chroma's ids by
+        # default, the bot passes the ingest manifest's instead
+        self.version = version or (lambda: collection_fingerprint(chroma))
+        self.oversample = oversample
+        self._index = None
+        self._lock = threading.Lock()
+
+    @property
+    def _collection(self):
+        return self.chroma._collection
+
+    @property
+    def embeddings(self):
+        return self.chroma.embeddings
+
+    @property
+    def index(self) -> QuantizedIndex:
+        """Saved index, rebuilt from Chroma when the collection changed"""
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = self._load_index()
+        return self._index
+
+    def _load_index(self) -> QuantizedIndex:
+        version = self.version()
+        index = QuantizedIndex.load(self.path, self.oversample)
+        if index is not None and index.version == version:
+            return index
+
+        print("Building quantized vector index...")
+        stored = self._collection.get(include=["embeddings", "documents", "metadatas"])
+        QuantizedIndex(self.oversample).build(
+            stored["ids"],
+            stored["embeddings"],
+            stored["documents"],
+            stored["metadatas"],
+            version,
+            collection_space(self._collection),
+        ).save(self.path)
+        # Reopen memory-mapped instead of keeping the built arrays in memory
+        return QuantizedIndex.load(self.path, self.oversample)
+
+    def invalidate(self, remove_saved: bool = False):
+        """Drop the loaded index; remove_saved also forces a rebuild from Chroma"""
+        with self._lock:
+            self._index = None
+            if remove_saved:
+                QuantizedIndex.remove(self.path)
+
+    def chunk_ids(self) -> List[str]:
+        return list(self.index.ids)
+
+    def has_match(self, where: Dict[str, Any]) -> bool:
+        """Whether any chunk matches a where clause (see applicable_where)"""
+        return len(self.index.matching_rows(where)) > 0
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs) -> List[str]:
+        added = self.chroma.add_texts(texts, metadatas=metadatas, ids=ids, **kwargs)
+        self.invalidate(remove_saved=True)
+        return added
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs):
+        self.chroma.delete(ids=ids, **kwargs)
+        self.invalidate(remove_saved=True)
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        raise NotImplementedError("Create the Chroma store first and wrap it in QuantizedVectorStore")
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        return self.chroma._select_relevance_score_fn()
+
+    def query(
+        self,
+        query_embeddings: List[List[float]],
+        n_results: int = 4,
+        where: Optional[Dict[str, Any]] = None,
+        include: Iterable[str] = ("documents", "metadatas", "distances"),
+    ) -> Dict[str, List[List[Any]]]:
+        """Same arguments and result layout as Chroma's collection.query()"""
+        index = self.index
+        matches = index.search_batch(query_embeddings, n_results, where)
+        result = {
+            "ids": [[index.ids[row] for row, _ in hits] for hits in matches],
+            "distances": [[distance for _, distance in hits] for hits in matches],
+            "metadatas": [[index.metadatas[row] for row, _ in hits] for hits in matches],
+        }
+        if "documents" in include:
+            result["documents"] = [[index.text(row) for row, _ in hits] for hits in matches]
+        return result
+
+    def similarity_search_by_vector_with_relevance_scores(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs
+    ) -> List[Tuple[Document, float]]:
+        """(document, distance) pairs, nearest first, like Chroma's method of the same name"""
+        index = self.index
+        return [
+            (index.document(row), distance)
+            for row, distance in index.search_batch([embedding], k, filter)[0]
+        ]
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs
+    ) -> List[Document]:
+        return [
+            doc for doc, _ in self.similarity_search_by_vector_with_relevance_scores(embedding, k, filter)
+        ]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_relevance_scores(
+            self.embeddings.embed_query(query), k, filter
+        )
+
+    def _similarity_search_with_relevance_scores(
+        self, query: str, k: int = 4, **kwargs
+    ) -> List[Tuple[Document, float]]:
+        relevance = self._select_relevance_score_fn()
+        return [
+            (doc, relevance(distance))
+            for doc, distance in self.similarity_search_with_score(query, k, kwargs.get("filter"))
+        ]
+
+    def similarity_search(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
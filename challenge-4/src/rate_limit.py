@@ -0,0 +1,108 @@
+import re
+import time
+import random
+import asyncio
+from typing import Callable, Any, Optional
+
+# Patterns identifying rate limit / quota errors from Gemini and OpenAI by message,
+# for errors that carry no HTTP status
+RATE_LIMIT_PATTERN = re.compile(
+    r"\b429\b|rate ?limit|resource[ _]?exhausted|quota|too many requests"
+)
+
+# Patterns identifying transient server-side failures worth retrying
+TRANSIENT_PATTERN = re.compile(
+    r"\b5\d\d\b|unavailable|deadline|timeout|timed out|connection"
+)
+
+
+def http_status(error: Exception) -> Optional[int]:
+    """HTTP status of an API error (openai status_code, google code), if any"""
+    for attribute in ("status_code", "http_status", "code"):
+        status = getattr(error, attribute, None)
+        if isinstance(status, int) and 100 <= status < 600:
+            return status
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _message(error: Exception) -> str:
+    return f"{type(error).__name__} {error}".lower()
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    status = http_status(error)
+    if status is not None:
+        return status == 429
+    return RATE_LIMIT_PATTERN.search(_message(error)) is not None
+
+
+def is_transient_error(error: Exception) -> bool:
+    status = http_status(error)
+    if status is not None:
+        return status >= 500
+    return TRANSIENT_PATTERN.search(_message(error)) is not None
+
+
+def retry_delay(
+    error: Exception, attempt: int, base_delay: float = 1.0, max_delay: float = 60.0
+) -> float:
+    """Exponential backoff with jitter; rate limits back off twice as hard"""
+    delay = base_delay * (2**attempt)
+    if is_rate_limit_error(error):
+        delay *= 2
+    return min(max_delay, delay) * random.uniform(0.5, 1.0)
+
+
+def _should_retry(error: Exception, attempt: int, max_retries: int) -> bool:
+    return attempt < max_retries and (
+        is_rate_limit_error(error) or is_transient_error(error)
+    )
+
+
+def call_with_retry(
+    fn: Callable[..., Any],
+    *args,
+    max_retries: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 60.0,
+    on_retry: Callable[[Exception, int, float], None] = None,
+    **kwargs,
+) -> Any:
+    """Call fn, retrying rate limit and transient errors with backoff"""
+    attempt = 0
+    while True:
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if not _should_retry(e, attempt, max_retries):
+                raise
+            delay = retry_delay(e, attempt, base_delay, max_delay)
+            if on_retry is not None:
+                on_retry(e, attempt, delay)
+            time.sleep(delay)
+            attempt += 1
+
+
+async def acall_with_retry(
+    fn: Callable[..., Any],
+    *args,
+    max_retries: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 60.0,
+    on_retry: Callable[[Exception, int, float], None] = None,
+    **kwargs,
+) -> Any:
+    """Await fn, retrying rate limit and transient errors with backoff"""
+    attempt = 0
+    while True:
+        try:
+            return await fn(*args, **kwargs)
+        except Exception as e:
+            if not _should_retry(e, attempt, max_retries):
+                raise
+            delay = retry_delay(e, attempt, base_delay, max_delay)
+            if on_retry is not None:
+                on_retry(e, attempt, delay)
+            await asyncio.sleep(delay)
+            attempt += 1
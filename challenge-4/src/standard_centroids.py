@@ -0,0 +1,185 @@
+import os
+import hashlib
+from typing import List, Dict, Any, Tuple, Optional
+
+import numpy as np
+
+from standard_refs import metadata_standards
+
+CENTROID_INDEX_NAME = "standard_centroids.npz"
+
+
+def collection_fingerprint(vectorstore) -> str:
+    """Fingerprint of the chunk ids in a Chroma collection"""
+    ids = sorted(vectorstore._collection.get(include=[])["ids"])
+    digest = hashlib.sha1("\n".join(ids).encode("utf-8")).hexdigest()
+    return f"{len(ids)}:{digest}"
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def _spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = 10) -> np.ndarray:
+    """k unit-length centroids of unit-length vectors (cosine k-means)"""
+    # Chunks are stored in document order, so evenly spaced seeds start from
+    # different sections of the standard and keep the result deterministic
+    seeds = np.linspace(0, len(vectors) - 1, k).round().astype(int)
+    centroids = vectors[seeds].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        for cluster in range(k):
+            members = vectors[assignment == cluster]
+            if len(members):
+                centroids[cluster] = members.sum(axis=0)
+        centroids = _normalize_rows(centroids)
+    return centroids
+
+
+class StandardCentroidIndex:
+    """A few centroid vectors per standard, built from its chunk embeddings.
+
+    Every standard is scored against a query with one matrix-vector product
+    (its score is the best cosine similarity over its centroids), so the
+    full candidate ranking costs microseconds and needs no LLM call.
+    """
+
+    def __init__(self, centroids_per_standard: int = 3):
+        self.centroids_per_standard = centroids_per_standard
+        self.version = None
+        # Standard ids ("FAS 10") and types, one per standard
+        self.standards: List[str] = []
+        self.standard_types: List[str] = []
+        self.chunk_counts: List[int] = []
+        # Unit-length centroids and the index of the standard each belongs to
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.owners = np.zeros(0, dtype=np.int64)
+
+    def build(
+        self,
+        embeddings: List[List[float]],
+        metadatas: List[Dict[str, Any]],
+        version: str = None,
+    ) -> "StandardCentroidIndex":
+        """Build centroids from chunk embeddings tagged with standard_type/standard_number"""
+        groups: Dict[Tuple[str, str], List[int]] = {}
+        for row, metadata in enumerate(metadatas):
+            # Chunks of combined files count towards each of their standards
+            for standard in metadata_standards(metadata or {}):
+                groups.setdefault(standard, []).append(row)
+
+        self.version = version
+        self.standards, self.standard_types, self.chunk_counts = [], [], []
+        if not groups:
+            self.matrix = np.zeros((0, 0), dtype=np.float32)
+            self.owners = np.zeros(0, dtype=np.int64)
+            return self
+
+        vectors = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        centroids, owners = [], []
+        for (standard_type, standard_number), rows in sorted(
+            groups.items(), key=lambda item: (item[0][0], int(item[0][1]))
+        ):
+            k = min(self.centroids_per_standard, len(rows))
+            centroids.append(_spherical_kmeans(vectors[rows], k))
+            owners.extend([len(self.standards)] * k)
+            self.standards.append(f"{standard_type} {standard_number}")
+            self.standard_types.append(standard_type)
+            self.chunk_counts.append(len(rows))
+
+        self.matrix = np.concatenate(centroids).astype(np.float32)
+        self.owners = np.asarray(owners, dtype=np.int64)
+        return self
+
+    def __len__(self):
+        return len(self.standards)
+
+    def rank_batch(
+        self,
+        query_embeddings: List[List[float]],
+        k: Optional[int] = None,
+        standard_type: Optional[str] = None,
+    ) -> List[List[Tuple[str, float]]]:
+        """Standards ranked by similarity for each query, best first.
+
+        k limits each ranking; standard_type ("FAS" or "SS") keeps only one type.
+        """
+        if not self.standards:
+            return [[] for _ in query_embeddings]
+        queries = _normalize_rows(np.asarray(query_embeddings, dtype=np.float32))
+        similarities = queries @ self.matrix.T
+
+        # Best centroid per standard (each standard's centroids are contiguous)
+        starts = np.flatnonzero(np.r_[True, self.owners[1:] != self.owners[:-1]])
+        scores = np.maximum.reduceat(similarities, starts, axis=1)
+
+        allowed = np.arange(len(self.standards))
+        if standard_type:
+            allowed = allowed[np.asarray(self.standard_types) == standard_type.upper()]
+        rankings = []
+        for row in scores:
+            order = allowed[np.argsort(-row[allowed], kind="stable")]
+            rankings.append([(self.standards[i], float(row[i])) for i in order[:k]])
+        return rankings
+
+    def rank(
+        self,
+        query_embedding: List[float],
+        k: Optional[int] = None,
+        standard_type: Optional[str] = None,
+    ) -> List[Tuple[str, float]]:
+        """Standards ranked by similarity to one query, best first"""
+        return self.rank_batch([query_embedding], k, standard_type)[0]
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            version=np.asarray(self.version or ""),
+            centroids_per_standard=np.asarray(self.centroids_per_standard),
+            standards=np.asarray(self.standards, dtype=str),
+            standard_types=np.asarray(self.standard_types, dtype=str),
+            chunk_counts=np.asarray(self.chunk_counts, dtype=np.int64),
+            matrix=self.matrix,
+            owners=self.owners,
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "StandardCentroidIndex":
+        with np.load(path) as payload:
+            index = cls(int(payload["centroids_per_standard"]))
+            index.version = str(payload["version"]) or None
+            index.standards = payload["standards"].tolist()
+            index.standard_types = payload["standard_types"].tolist()
+            index.chunk_counts = payload["chunk_counts"].tolist()
+            index.matrix = payload["matrix"]
+            index.owners = payload["owners"]
+        return index
+
+    @classmethod
+    def from_vectorstore(
+        cls,
+        vectorstore,
+        path: Optional[str] = None,
+        centroids_per_standard: int = 3,
+    ) -> "StandardCentroidIndex":
+        """Load the index saved at path, or build it from the stored chunk embeddings.
+
+        The saved index is reused while the collection's chunk ids are unchanged.
+        No text is re-embedded: the vectors come straight from Chroma.
+        """
+        version = collection_fingerprint(vectorstore)
+        if path and os.path.exists(path):
+            index = cls.load(path)
+            if index.version == version and index.centroids_per_standard == centroids_per_standard:
+                return index
+
+        stored = vectorstore._collection.get(include=["embeddings", "metadatas"])
+        index = cls(centroids_per_standard).build(
+            stored["embeddings"], stored["metadatas"], version
+        )
+        if path:
+            index.save(path)
+        return index
@@ -0,0 +1,173 @@
+import re
+from typing import List, Dict, Any, Tuple, Optional
+
+# "FAS 10", "FAS-32", "SS9", "SS No. 9", "Financial Accounting Standard No. 28",
+# "Shari'ah Standard 12"
+STANDARD_REF_PATTERN = re.compile(
+    r"\b(FAS|SS|Financial\s+Accounting\s+Standard|Shari'?a'?h?\s+Standard)"
+    r"[\s_-]*(?:No\.?\s*)?(\d+)(?!\d)",
+    re.IGNORECASE,
+)
+
+STANDARD_FLAG_PATTERN = re.compile(r"^(fas|ss)_(\d+)$")
+
+UNKNOWN = "Unknown"
+
+
+def _standard_type(label: str) -> str:
+    label = label.upper()
+    if label in ("FAS", "SS"):
+        return label
+    return "FAS" if label.startswith("FINANCIAL") else "SS"
+
+
+def detect_standard_refs(text: str) -> List[Tuple[str, str]]:
+    """(standard type, number) pairs referenced in a text, in order of appearance"""
+    refs = []
+    for match in STANDARD_REF_PATTERN.finditer(text or ""):
+        ref = (_standard_type(match.group(1)), str(int(match.group(2))))
+        if ref not in refs:
+            refs.append(ref)
+    return refs
+
+
+def standard_flag(standard_type: str, standard_number: str) -> str:
+    """Boolean metadata key marking the chunks of one standard, e.g. ss_11"""
+    return f"{standard_type.lower()}_{standard_number}"
+
+
+def standard_metadata(source: str) -> Dict[str, Any]:
+    """Standard metadata for a standard's file name.
+
+    standard_type and standard_number name the first standard in the name.
+    Every standard in it also gets a flag (standard_flag), so files covering
+    several standards ("FAS 10 & SS 11.pdf") match filters for each of them;
+    Chroma metadata values cannot be lists.
+    """
+    refs = detect_standard_refs(source)
+    standard_type, standard_number = refs[0] if refs else (UNKNOWN, UNKNOWN)
+    metadata = {"standard_type": standard_type, "standard_number": standard_number}
+    metadata.update({standard_flag(t, n): True for t, n in refs})
+    return metadata
+
+
+def metadata_standards(metadata: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """(standard type, number) pairs a chunk belongs to, from its metadata"""
+    flagged = []
+    for key, value in metadata.items():
+        match = STANDARD_FLAG_PATTERN.match(key)
+        if match and value is True:
+            flagged.append((match.group(1).upper(), match.group(2)))
+    if flagged:
+        return flagged
+    standard_type = metadata.get("standard_type", UNKNOWN)
+    standard_number = str(metadata.get("standard_number", UNKNOWN))
+    if UNKNOWN in (standard_type, standard_number):
+        return []
+    return [(standard_type, standard_number)]
+
+
+def build_where(
+    standard_type: Optional[str] = None,
+    standard_number: Optional[str] = None,
+    refs: Optional[List[Tuple[str, str]]] = None,
+) -> Optional[Dict[str, Any]]:
+    """Chroma where clause for a standard type and/or number, or for several refs"""
+    if refs:
+        clauses = []
+        for t, n in refs:
+            clause = build_where(t, n)
+            clauses.extend(clause["$or"] if "$or" in clause else [clause])
+        return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+    conditions = []
+    if standard_type:
+        conditions.append({"standard_type": standard_type.upper()})
+    if standard_number:
+        conditions.append({"standard_number": str(standard_number)})
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    # The flag also matches secondary standards of combined files; the
+    # type/number pair keeps stores tagged before flags existed working
+    return {
+        "$or": [
+            {"$and": conditions},
+            {standard_flag(standard_type.upper(), str(standard_number)): True},
+        ]
+    }
+
+
+def resolve_where(
+    query: str,
+    standard_type: Optional[str] = None,
+    standard_number: Optional[str] = None,
+    auto_detect: bool = True,
+) -> Optional[Dict[str, Any]]:
+    """Filter from explicit arguments, else from standards referenced in the query"""
+    if standard_type or standard_number:
+        return build_where(standard_type, standard_number)
+    if auto_detect:
+        return build_where(refs=detect_standard_refs(query))
+    return None
+
+
+def matches_where(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate the subset of Chroma where clauses built here against metadata"""
+    if not where:
+        return True
+    if "$and" in where:
+        return all(matches_where(metadata, clause) for clause in where["$and"])
+    if "$or" in where:
+        return any(matches_where(metadata, clause) for clause in where["$or"])
+    for key, expected in where.items():
+        if isinstance(expected, dict):
+            if "$eq" in expected and metadata.get(key) != expected["$eq"]:
+                return False
+            if "$in" in expected and metadata.get(key) not in expected["$in"]:
+                return False
+        elif metadata.get(key) != expected:
+            return False
+    return True
+
+
+def applicable_where(vectorstore, where: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """The where clause, or None when no chunk in the collection matches it.
+
+    Lets a search scoped to a standard that is not indexed fall back to the
+    whole collection instead of returning nothing.
+    """
+    if where is None:
+        return None
+    # The int8 quantized store filters its own copy of the metadata
+    if hasattr(vectorstore, "has_match"):
+        return where if vectorstore.has_match(where) else None
+    matches = vectorstore._collection.get(where=where, limit=1, include=[])
+    return where if matches["ids"] else None
+
+
+def scoped_search(
+    vectorstore,
+    query: str,
+    k: int = 5,
+    standard_type: Optional[str] = None,
+    standard_number: Optional[str] = None,
+    auto_detect: bool = True,
+    query_embedding: Optional[List[float]] = None,
+) -> Tuple[list, Optional[Dict[str, Any]]]:
+    """Similarity search with standard filters pushed down into Chroma.
+
+    Returns the (Document, distance) pairs and the where clause that was
+    applied, which is None for an unfiltered search.
+    """
+    where = applicable_where(
+        vectorstore, resolve_where(query, standard_type, standard_number, auto_detect)
+    )
+    if query_embedding is not None:
+        docs_and_scores = vectorstore.similarity_search_by_vector_with_relevance_scores(
+            query_embedding, k=k, filter=where
+        )
+    else:
+        docs_and_scores = vectorstore.similarity_search_with_score(query, k=k, filter=where)
+    return docs_and_scores, where
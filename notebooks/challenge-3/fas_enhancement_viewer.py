@@ -2,7 +2,12 @@ import streamlit as st
 import json
 import os
 import re
+import html
 from pathlib import Path
+from urllib.parse import urlencode
+
+from results_search import ResultsSearchIndex, SEARCH_FIELDS
+from validation_schema import load_validation_rows, VALIDATION_RESULTS_NAME
 
 # Set page configuration
 st.set_page_config(
@@ -316,8 +321,59 @@ with st.expander("ℹ️ About The Multi-Agent System", expanded=False):
         <p>Evaluates proposed enhancements for Shariah compliance, consistency, practicality, clarity, relevance, and thoroughness.</p>
         """, unsafe_allow_html=True)
 
-# Path to the JSON file
-try:
+# Markdown-to-HTML patterns, compiled once
+BOLD_PATTERN = re.compile(r'\*\*(.*?)\*\*')
+ITALIC_PATTERN = re.compile(r'\*(.*?)\*')
+BULLET_PATTERN = re.compile(r'\n\s*\*\s+')
+
+# Enhancement section patterns
+# Look for patterns like "**1. Title**" or "**Section:**" which are common in the enhancement content
+ENHANCEMENT_SECTION_PATTERN = re.compile(
+    r'(?:\*\*\d+\.\s+[^*]+\*\*|\*\*Section:\*\*)[^\*]+(?=\*\*\d+\.|\*\*Section:\*\*|$)')
+ENHANCEMENT_INTRO_PATTERN = re.compile(
+    r'^(.*?)(?:\*\*\d+\.|\*\*Section:\*\*)', re.DOTALL)
+NUMBERED_HEADING_PATTERN = re.compile(r'(\*\*\d+\.\s+[^*]+\*\*)')
+TITLE_PATTERN = re.compile(r'\*\*([^*]+)\*\*')
+
+# Verdict shown in each validation column
+VALIDATION_CATEGORIES = {
+    "approved": "Approved",
+    "modified": "Approved with Modifications",
+    "rejected": "Rejected",
+}
+
+# Validation category patterns, for results without structured validation rows
+VALIDATION_PATTERNS = {
+    "approved": re.compile(
+        r'(?:Approved|APPROVED)[:\s]+(.*?)(?=(?:Approved with Modifications|APPROVED WITH MODIFICATIONS|Rejected|REJECTED|\Z))', re.DOTALL),
+    "modified": re.compile(
+        r'(?:Approved with Modifications|APPROVED WITH MODIFICATIONS)[:\s]+(.*?)(?=(?:Approved|APPROVED|Rejected|REJECTED|\Z))', re.DOTALL),
+    "rejected": re.compile(
+        r'(?:Rejected|REJECTED)[:\s]+(.*?)(?=(?:Approved|APPROVED|Approved with Modifications|APPROVED WITH MODIFICATIONS|\Z))', re.DOTALL),
+}
+
+# Display names for the standards shown so far; other standards use their standard_name
+STANDARD_LABELS = {
+    "FAS4": "FAS 4 (Murabaha)",
+    "FAS10": "FAS 10 (Istisna'a)",
+    "FAS32": "FAS 32 (Ijarah)"
+}
+
+
+def md_to_html(text, bullets=True):
+    """Convert markdown bold, italic and (optionally) bullet points to HTML"""
+    # Replace markdown bold with HTML
+    html = BOLD_PATTERN.sub(r'<strong>\1</strong>', text)
+    # Replace markdown italic with HTML
+    html = ITALIC_PATTERN.sub(r'<em>\1</em>', html)
+    # Handle bullet points
+    if bullets:
+        html = BULLET_PATTERN.sub(r'<br>• ', html)
+    return html
+
+
+def find_results_path():
+    """Path of the results file: next to the viewer, else in the notebooks folder"""
     # First try the same directory
     json_path = os.path.join(os.path.dirname(
         os.path.abspath(__file__)), "fas_enhancement_results.json")
@@ -326,10 +382,119 @@ try:
         project_root = Path(os.path.dirname(
             os.path.dirname(os.path.abspath(__file__))))
         json_path = project_root / "notebooks" / "fas_enhancement_results.json"
+    return str(json_path)
 
-    # Load the JSON data
+
+@st.cache_data(show_spinner=False)
+def load_results(json_path, mtime):
+    """Parsed results file, cached until its modification time changes"""
     with open(json_path, 'r') as f:
-        results = json.load(f)
+        return json.load(f)
+
+
+@st.cache_data(show_spinner=False)
+def load_validation(validation_path, mtime):
+    """Structured validation rows by standard and verdict, cached until the file changes"""
+    return load_validation_rows(validation_path)
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_search_index(json_path, mtime):
+    """Inverted index over the results, built once per results-file version"""
+    return ResultsSearchIndex().build(load_results(json_path, mtime))
+
+
+def render_validation_items(items):
+    """HTML for the validated enhancements of one verdict"""
+    rendered = []
+    for item in items:
+        parts = [f"<strong>{item['enhancement']}</strong>", md_to_html(item["rationale"])]
+        if item.get("modifications"):
+            parts.append(f"<strong>Modifications:</strong> {md_to_html(item['modifications'])}")
+        if item.get("referenced_clause"):
+            parts.append(f"<em>Reference: {item['referenced_clause']}</em>")
+        rendered.append("<br>".join(parts))
+    return "<br><br>".join(rendered)
+
+
+def render_enhancements(enhancement_text):
+    """Split the enhancements into an introduction and (title, HTML) cards"""
+    # Extract sections using a better pattern that matches the actual JSON structure
+    enhancement_sections = ENHANCEMENT_SECTION_PATTERN.findall(enhancement_text)
+
+    # Try to extract the introduction separately
+    intro_match = ENHANCEMENT_INTRO_PATTERN.search(enhancement_text)
+    intro_text = intro_match.group(1).strip() if intro_match else ""
+
+    cards = []
+    if enhancement_sections:
+        for i, section in enumerate(enhancement_sections, 1):
+            # Extract the title from the section if possible
+            title_match = TITLE_PATTERN.search(section)
+            title = title_match.group(
+                1) if title_match else f"Enhancement {i}"
+            cards.append((title, md_to_html(section.strip(), bullets=False)))
+        return {"intro": intro_text, "cards": cards}
+
+    # If our pattern matching didn't work, try another approach
+    # Look for numbered bullet points like "**1. Title**"
+    numbered_sections = NUMBERED_HEADING_PATTERN.split(enhancement_text)
+    if len(numbered_sections) > 2:  # More than 2 means we found matches
+        # Process the sections in pairs (heading + content)
+        for i in range(1, len(numbered_sections) - 1, 2):
+            heading = numbered_sections[i].strip().replace('**', '')
+            content = numbered_sections[i+1].strip()
+            # Combine the heading and content
+            cards.append(
+                (heading, md_to_html((numbered_sections[i] + content).strip())))
+        # First element might be an introduction
+        return {"intro": numbered_sections[0].strip(), "cards": cards}
+
+    # If we still can't split it nicely, show the whole thing
+    return {"intro": enhancement_text, "cards": []}
+
+
+@st.cache_data(show_spinner=False)
+def render_standard(json_path, mtime, key, validation_path=None, validation_mtime=None):
+    """Parsed and pre-rendered sections of one standard.
+
+    Cached per standard and results-file version, so switching standards or
+    tabs reuses the HTML instead of re-running the markdown transforms.
+    Validation columns come from the structured validation rows when the
+    standard has them, else from the validation_results text.
+    """
+    standard_data = load_results(json_path, mtime)[key]
+    validation_text = standard_data["validation_results"]
+
+    structured = None
+    if validation_path:
+        structured = load_validation(validation_path, validation_mtime).get(key)
+
+    validation = {}
+    for category, pattern in VALIDATION_PATTERNS.items():
+        if structured:
+            items = structured[VALIDATION_CATEGORIES[category]]
+            validation[category] = render_validation_items(items) if items else None
+            continue
+        match = pattern.search(validation_text)
+        validation[category] = md_to_html(match.group(1).strip()) if match else None
+
+    return {
+        "standard_name": standard_data["standard_name"],
+        "standard_info": standard_data["standard_info"],
+        "standard_info_html": md_to_html(standard_data["standard_info"]),
+        "enhancements": render_enhancements(standard_data["enhancements"]),
+        "enhancements_html": md_to_html(standard_data["enhancements"]),
+        "validation": validation,
+        "validation_html": md_to_html(validation_text),
+    }
+
+
+# Load the JSON data (re-read only when the file changes)
+json_path = find_results_path()
+try:
+    results_mtime = os.path.getmtime(json_path)
+    results = load_results(json_path, results_mtime)
 except FileNotFoundError:
     st.error("Error: Could not find the FAS enhancement results file. Make sure 'fas_enhancement_results.json' is in the same directory.")
     st.stop()
@@ -337,24 +502,54 @@ except json.JSONDecodeError:
     st.error("Error: Invalid JSON format in the results file.")
     st.stop()
 
+# Structured validation rows written next to the results file, if any
+validation_path = os.path.join(os.path.dirname(json_path), VALIDATION_RESULTS_NAME)
+if os.path.exists(validation_path):
+    validation_mtime = os.path.getmtime(validation_path)
+else:
+    validation_path, validation_mtime = None, None
+
 # Display standards in sidebar for navigation
 st.sidebar.header("Navigation")
 standard_options = {
-    "FAS4": "FAS 4 (Murabaha)",
-    "FAS10": "FAS 10 (Istisna'a)",
-    "FAS32": "FAS 32 (Ijarah)"
-}
-selected_key = st.sidebar.radio("Select a standard to view:", list(
-    standard_options.keys()), format_func=lambda x: standard_options[x])
+    key: STANDARD_LABELS.get(key, value.get("standard_name", key))
+    for key, value in results.items()
+}
+# Search hits link here with ?standard=...&section=...&q=..., which opens
+# their standard and shows the matched section above the tabs
+linked_standard = st.query_params.get("standard")
+linked_section = st.query_params.get("section")
+linked_query = st.query_params.get("q", "")
+standard_keys = list(standard_options.keys())
+selected_key = st.sidebar.radio(
+    "Select a standard to view:", standard_keys,
+    index=standard_keys.index(linked_standard) if linked_standard in standard_keys else 0,
+    format_func=lambda x: standard_options[x])
 
 # Get the standard data
 if selected_key in results:
-    standard_data = results[selected_key]
+    standard_data = render_standard(
+        json_path, results_mtime, selected_key, validation_path, validation_mtime)
 
     # Display the standard name as a header
     st.markdown(
         f"<div class='standard-title'>{standard_data['standard_name']}</div>", unsafe_allow_html=True)
 
+    # Section opened from a search hit, outside the tabs so it is always shown
+    if linked_section and linked_standard == selected_key:
+        search_index = load_search_index(json_path, results_mtime)
+        section = search_index.anchors.get(linked_section)
+        if section is not None:
+            highlights = next(
+                (hit.highlights for hit in search_index.search(linked_query)
+                 if hit.anchor == section.anchor), [])
+            st.markdown(
+                f"<div class='section-title' id='{section.anchor}'>Search match: "
+                f"{SEARCH_FIELDS[section.field]} › {html.escape(section.title)}</div>"
+                f"<div class='enhancement-card'>"
+                f"{md_to_html(search_index.section_html(section, highlights))}</div>",
+                unsafe_allow_html=True)
+
     # Create tabs for different sections
     tabs = st.tabs(["Standard Information", "Enhancements",
                    "Validation Results", "All Content"])
@@ -362,122 +557,33 @@ if selected_key in results:
     # Tab 1: Standard Information
     with tabs[0]:
         st.markdown(
-            "<div class='section-title'>Standard Information</div>", unsafe_allow_html=True)
+            f"<div class='section-title'>Standard Information</div>", unsafe_allow_html=True)
         st.markdown(standard_data["standard_info"])
 
     # Tab 2: Enhancements
     with tabs[1]:
         st.markdown(
-            "<div class='section-title'>Proposed Enhancements</div>", unsafe_allow_html=True)
+            f"<div class='section-title'>Proposed Enhancements</div>", unsafe_allow_html=True)
 
-        # Try to identify separate enhancements in the text
-        enhancement_text = standard_data["enhancements"]
+        enhancements = standard_data["enhancements"]
+        # If we found introduction text, display it first
+        if enhancements["intro"]:
+            st.markdown(enhancements["intro"])
 
-        # Extract sections using a better pattern that matches the actual JSON structure
-        import re
-
-        # Look for patterns like "**1. Title**" or "**Section:**" which are common in the enhancement content
-        # This pattern matches the heading format used in the enhancement sections
-        enhancement_sections = re.findall(
-            r'(?:\*\*\d+\.\s+[^*]+\*\*|\*\*Section:\*\*)[^\*]+(?=\*\*\d+\.|\*\*Section:\*\*|$)',
-            enhancement_text
-        )
-
-        # Try to extract the introduction separately
-        intro_match = re.search(
-            r'^(.*?)(?:\*\*\d+\.|\*\*Section:\*\*)', enhancement_text, re.DOTALL)
-        intro_text = intro_match.group(1).strip() if intro_match else ""
-
-        if enhancement_sections:
-            # If we found introduction text, display it first
-            if intro_text:
-                st.markdown(intro_text)
-
-            # Display each enhancement in a card
-            for i, section in enumerate(enhancement_sections, 1):
-                # Extract the title from the section if possible
-                title_match = re.search(r'\*\*([^*]+)\*\*', section)
-                title = title_match.group(
-                    1) if title_match else f"Enhancement {i}"
-
-                with st.expander(title):
-                    # Convert markdown asterisks to HTML for better styling
-                    formatted_section = section.strip()
-                    # Replace markdown bold with HTML
-                    formatted_section = re.sub(
-                        r'\*\*(.*?)\*\*', r'<strong>\1</strong>', formatted_section)
-                    # Replace markdown italic with HTML
-                    formatted_section = re.sub(
-                        r'\*(.*?)\*', r'<em>\1</em>', formatted_section)
-
-                    st.markdown(
-                        f"<div class='enhancement-card'>{formatted_section}</div>",
-                        unsafe_allow_html=True
-                    )
-        else:
-            # If our pattern matching didn't work, try another approach
-            # Look for numbered bullet points like "**1. Title**"
-            numbered_sections = re.split(
-                r'(\*\*\d+\.\s+[^*]+\*\*)', enhancement_text)
-
-            if len(numbered_sections) > 2:  # More than 2 means we found matches
-                # First element might be an introduction
-                if numbered_sections[0].strip():
-                    st.markdown(numbered_sections[0].strip())
-
-                # Process the sections in pairs (heading + content)
-                for i in range(1, len(numbered_sections), 2):
-                    if i+1 < len(numbered_sections):
-                        heading = numbered_sections[i].strip().replace(
-                            '**', '')
-                        content = numbered_sections[i+1].strip()
-
-                        with st.expander(heading):
-                            # Combine the heading and content
-                            combined_content = numbered_sections[i] + content
-                            # Convert markdown asterisks to HTML for better styling
-                            formatted_content = combined_content.strip()
-                            # Replace markdown bold with HTML
-                            formatted_content = re.sub(
-                                r'\*\*(.*?)\*\*', r'<strong>\1</strong>', formatted_content)
-                            # Replace markdown italic with HTML
-                            formatted_content = re.sub(
-                                r'\*(.*?)\*', r'<em>\1</em>', formatted_content)
-                            # Handle bullet points
-                            formatted_content = re.sub(
-                                r'\n\s*\*\s+', r'<br>• ', formatted_content)
-
-                            st.markdown(
-                                f"<div class='enhancement-card'>{formatted_content}</div>",
-                                unsafe_allow_html=True
-                            )
-            else:
-                # If we still can't split it nicely, just show the whole thing
-                st.markdown(enhancement_text)
+        # Display each enhancement in a card
+        for title, card_html in enhancements["cards"]:
+            with st.expander(title):
+                st.markdown(
+                    f"<div class='enhancement-card'>{card_html}</div>",
+                    unsafe_allow_html=True
+                )
 
     # Tab 3: Validation Results
     with tabs[2]:
         st.markdown(
-            "<div class='section-title'>Validation Results</div>", unsafe_allow_html=True)
-
-        validation_text = standard_data["validation_results"]
-
-        # Look for common patterns in validation results
-        approved_items = []
-        modified_items = []
-        rejected_items = []
-
-        # Try to extract sections for Approved, Approved with Modifications, and Rejected
-        approved_pattern = r'(?:Approved|APPROVED)[:\s]+(.*?)(?=(?:Approved with Modifications|APPROVED WITH MODIFICATIONS|Rejected|REJECTED|\Z))'
-        modified_pattern = r'(?:Approved with Modifications|APPROVED WITH MODIFICATIONS)[:\s]+(.*?)(?=(?:Approved|APPROVED|Rejected|REJECTED|\Z))'
-        rejected_pattern = r'(?:Rejected|REJECTED)[:\s]+(.*?)(?=(?:Approved|APPROVED|Approved with Modifications|APPROVED WITH MODIFICATIONS|\Z))'
+            f"<div class='section-title'>Validation Results</div>", unsafe_allow_html=True)
 
-        approved_match = re.search(
-            approved_pattern, validation_text, re.DOTALL)
-        modified_match = re.search(
-            modified_pattern, validation_text, re.DOTALL)
-        rejected_match = re.search(
-            rejected_pattern, validation_text, re.DOTALL)
+        validation = standard_data["validation"]
 
         # Create columns for the validation categories
         col1, col2, col3 = st.columns(3)
@@ -485,21 +591,9 @@ if selected_key in results:
         with col1:
             st.markdown("<div class='subsection-title'>Approved</div>",
                         unsafe_allow_html=True)
-            if approved_match:
-                # Format the content for better visibility
-                approved_content = approved_match.group(1).strip()
-                # Replace markdown bold with HTML
-                approved_content = re.sub(
-                    r'\*\*(.*?)\*\*', r'<strong>\1</strong>', approved_content)
-                # Replace markdown italic with HTML
-                approved_content = re.sub(
-                    r'\*(.*?)\*', r'<em>\1</em>', approved_content)
-                # Handle bullet points
-                approved_content = re.sub(
-                    r'\n\s*\*\s+', r'<br>• ', approved_content)
-
+            if validation["approved"]:
                 st.markdown(
-                    f"<div class='enhancement-card validation-approved'>{approved_content}</div>",
+                    f"<div class='enhancement-card validation-approved'>{validation['approved']}</div>",
                     unsafe_allow_html=True
                 )
             else:
@@ -514,21 +608,9 @@ if selected_key in results:
         with col2:
             st.markdown(
                 "<div class='subsection-title'>Approved with Modifications</div>", unsafe_allow_html=True)
-            if modified_match:
-                # Format the content for better visibility
-                modified_content = modified_match.group(1).strip()
-                # Replace markdown bold with HTML
-                modified_content = re.sub(
-                    r'\*\*(.*?)\*\*', r'<strong>\1</strong>', modified_content)
-                # Replace markdown italic with HTML
-                modified_content = re.sub(
-                    r'\*(.*?)\*', r'<em>\1</em>', modified_content)
-                # Handle bullet points
-                modified_content = re.sub(
-                    r'\n\s*\*\s+', r'<br>• ', modified_content)
-
+            if validation["modified"]:
                 st.markdown(
-                    f"<div class='enhancement-card validation-modified'>{modified_content}</div>",
+                    f"<div class='enhancement-card validation-modified'>{validation['modified']}</div>",
                     unsafe_allow_html=True
                 )
             else:
@@ -543,21 +625,9 @@ if selected_key in results:
         with col3:
             st.markdown("<div class='subsection-title'>Rejected</div>",
                         unsafe_allow_html=True)
-            if rejected_match:
-                # Format the content for better visibility
-                rejected_content = rejected_match.group(1).strip()
-                # Replace markdown bold with HTML
-                rejected_content = re.sub(
-                    r'\*\*(.*?)\*\*', r'<strong>\1</strong>', rejected_content)
-                # Replace markdown italic with HTML
-                rejected_content = re.sub(
-                    r'\*(.*?)\*', r'<em>\1</em>', rejected_content)
-                # Handle bullet points
-                rejected_content = re.sub(
-                    r'\n\s*\*\s+', r'<br>• ', rejected_content)
-
+            if validation["rejected"]:
                 st.markdown(
-                    f"<div class='enhancement-card validation-rejected'>{rejected_content}</div>",
+                    f"<div class='enhancement-card validation-rejected'>{validation['rejected']}</div>",
                     unsafe_allow_html=True
                 )
             else:
@@ -573,20 +643,8 @@ if selected_key in results:
         st.markdown(
             "<div class='subsection-title'>Full Validation Report</div>", unsafe_allow_html=True)
         with st.expander("View Full Validation Report"):
-            # Format the validation text for better visibility
-            formatted_validation = validation_text
-            # Replace markdown bold with HTML
-            formatted_validation = re.sub(
-                r'\*\*(.*?)\*\*', r'<strong>\1</strong>', formatted_validation)
-            # Replace markdown italic with HTML
-            formatted_validation = re.sub(
-                r'\*(.*?)\*', r'<em>\1</em>', formatted_validation)
-            # Handle bullet points
-            formatted_validation = re.sub(
-                r'\n\s*\*\s+', r'<br>• ', formatted_validation)
-
             st.markdown(
-                f"<div style='background-color: #FFFFFF; padding: 20px; color: #000000; border: 1px solid #DDDDDD; border-radius: 5px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);'>{formatted_validation}</div>",
+                f"<div style='background-color: #FFFFFF; padding: 20px; color: #000000; border: 1px solid #DDDDDD; border-radius: 5px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);'>{standard_data['validation_html']}</div>",
                 unsafe_allow_html=True
             )
 
@@ -598,107 +656,61 @@ if selected_key in results:
         st.markdown(
             "<div class='subsection-title'>Standard Information</div>", unsafe_allow_html=True)
         with st.expander("View Standard Information", expanded=False):
-            # Format the content for better visibility
-            standard_info = standard_data["standard_info"]
-            # Replace markdown bold with HTML
-            standard_info = re.sub(
-                r'\*\*(.*?)\*\*', r'<strong>\1</strong>', standard_info)
-            # Replace markdown italic with HTML
-            standard_info = re.sub(r'\*(.*?)\*', r'<em>\1</em>', standard_info)
-            # Handle bullet points
-            standard_info = re.sub(r'\n\s*\*\s+', r'<br>• ', standard_info)
-
             st.markdown(
-                f"<div style='background-color: #FFFFFF; padding: 20px; color: #000000; border: 1px solid #DDDDDD; border-radius: 5px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);'>{standard_info}</div>",
+                f"<div style='background-color: #FFFFFF; padding: 20px; color: #000000; border: 1px solid #DDDDDD; border-radius: 5px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);'>{standard_data['standard_info_html']}</div>",
                 unsafe_allow_html=True
             )
 
         st.markdown(
             "<div class='subsection-title'>Proposed Enhancements</div>", unsafe_allow_html=True)
         with st.expander("View Proposed Enhancements", expanded=False):
-            # Format the content for better visibility
-            enhancements = standard_data["enhancements"]
-            # Replace markdown bold with HTML
-            enhancements = re.sub(
-                r'\*\*(.*?)\*\*', r'<strong>\1</strong>', enhancements)
-            # Replace markdown italic with HTML
-            enhancements = re.sub(r'\*(.*?)\*', r'<em>\1</em>', enhancements)
-            # Handle bullet points
-            enhancements = re.sub(r'\n\s*\*\s+', r'<br>• ', enhancements)
-
             st.markdown(
-                f"<div style='background-color: #FFFFFF; padding: 20px; color: #000000; border: 1px solid #DDDDDD; border-radius: 5px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);'>{enhancements}</div>",
+                f"<div style='background-color: #FFFFFF; padding: 20px; color: #000000; border: 1px solid #DDDDDD; border-radius: 5px; box-shadow: 0 2px 4px rgba(0,0,0,0.1);'>{standard_data['enhancements_html']}</div>",
                 unsafe_allow_html=True
             )
 
         st.markdown(
             "<div class='subsection-title'>Validation Results</div>", unsafe_allow_html=True)
         with st.expander("View Validation Results", expanded=False):
-            # Format the content for better visibility
-            validation = standard_data["validation_results"]
-            # Replace markdown bold with HTML
-            validation = re.sub(
-                r'\*\*(.*?)\*\*', r'<strong>\1</strong>', validation)
-            # Replace markdown italic with HTML
-            validation = re.sub(r'\*(.*?)\*', r'<em>\1</em>', validation)
-            # Handle bullet points
-            validation = re.sub(r'\n\s*\*\s+', r'<br>• ', validation)
-
             st.markdown(
-                f"<div style='background-color: #F8F9FA; padding: 15px; color: #333333;'>{validation}</div>",
+                f"<div style='background-color: #F8F9FA; padding: 15px; color: #333333;'>{standard_data['validation_html']}</div>",
                 unsafe_allow_html=True
             )
 
 # Add a search functionality
 st.sidebar.markdown("---")
 st.sidebar.header("Search")
-search_term = st.sidebar.text_input("Search for specific topics:")
-
-# Function to highlight search terms
-
-
-def highlight_text(text, search):
-    if not search or search.strip() == "":
-        return text
-
-    # Escape special regex characters in the search term
-    escaped_search = re.escape(search)
-    highlighted_text = re.sub(
-        f'({escaped_search})',
-        r'<span class="search-highlight">\1</span>',
-        text,
-        flags=re.IGNORECASE
-    )
-    return highlighted_text
+search_term = st.sidebar.text_input(
+    "Search for specific topics:", value=linked_query,
+    help='Words match as prefixes (istisna finds Istisna\'a); use "quotes" for exact phrases.')
 
+# Number of ranked sections listed in the sidebar
+MAX_SEARCH_HITS = 10
 
 # Display search results if search term is provided
 if search_term:
+    search_index = load_search_index(json_path, results_mtime)
+    hits = search_index.search(search_term)
+
     st.sidebar.markdown("---")
     st.sidebar.markdown(f"### Search Results for '{search_term}'")
 
-    results_found = False
-    for std_key, std_data in results.items():
-        hits = 0
-
-        # Search in standard info
-        if search_term.lower() in std_data["standard_info"].lower():
-            hits += std_data["standard_info"].lower().count(search_term.lower())
-
-        # Search in enhancements
-        if search_term.lower() in std_data["enhancements"].lower():
-            hits += std_data["enhancements"].lower().count(search_term.lower())
-
-        # Search in validation results
-        if search_term.lower() in std_data["validation_results"].lower():
-            hits += std_data["validation_results"].lower().count(search_term.lower())
-
-        if hits > 0:
-            results_found = True
+    # Occurrences and matching fields per standard
+    occurrences = {}
+    locations = {}
+    for hit in hits:
+        occurrences[hit.standard] = occurrences.get(
+            hit.standard, 0) + len(hit.highlights)
+        fields = locations.setdefault(hit.standard, [])
+        if SEARCH_FIELDS[hit.field] not in fields:
+            fields.append(SEARCH_FIELDS[hit.field])
+
+    for std_key in results:
+        if std_key in occurrences:
             st.sidebar.markdown(
-                f"<div class='fas-badge'>{standard_options[std_key]}</div> {hits} occurrences", unsafe_allow_html=True)
+                f"<div class='fas-badge'>{standard_options[std_key]}</div> {occurrences[std_key]} occurrences", unsafe_allow_html=True)
 
-    if not results_found:
+    if not hits:
         st.sidebar.markdown(
             """
             <div style='background-color: #E3F2FD; padding: 10px; border-radius: 5px; border-left: 4px solid #1976D2; color: #0D47A1; margin-top: 10px;'>
@@ -706,31 +718,29 @@ if search_term:
             </div>
             """, unsafe_allow_html=True
         )
-
-if search_term:
-    st.sidebar.markdown("### Search Results")
-    for key, value in results.items():
-        found = False
-        locations = []
-
-        # Search in standard info
-        if search_term.lower() in value["standard_info"].lower():
-            found = True
-            locations.append("Standard Information")
-
-        # Search in enhancements
-        if search_term.lower() in value["enhancements"].lower():
-            found = True
-            locations.append("Enhancements")
-
-        # Search in validation
-        if search_term.lower() in value["validation_results"].lower():
-            found = True
-            locations.append("Validation Results")
-
-        if found:
+    else:
+        st.sidebar.markdown("### Search Results")
+        for std_key in results:
+            if std_key in locations:
+                st.sidebar.markdown(
+                    f"**{results[std_key]['standard_name']}**: Found in {', '.join(locations[std_key])}")
+
+        # Best matching sections with highlighted excerpts; each links to
+        # its standard with the section shown at the top of the page
+        st.sidebar.markdown("### Top Matching Sections")
+        for hit in hits[:MAX_SEARCH_HITS]:
+            link = "?" + urlencode(
+                {"standard": hit.standard, "section": hit.anchor, "q": search_term})
+            section_title = (
+                f"<a href='{html.escape(link)}#{hit.anchor}' target='_self'>"
+                f"{html.escape(hit.section)}</a>")
             st.sidebar.markdown(
-                f"**{value['standard_name']}**: Found in {', '.join(locations)}")
+                f"<div class='enhancement-card'><strong>{standard_options[hit.standard]}</strong> › "
+                f"{SEARCH_FIELDS[hit.field]} › {section_title}<br>"
+                f"<small>{search_index.snippet(hit)}</small></div>",
+                unsafe_allow_html=True
+            )
+
 
 # About section
 st.sidebar.markdown("---")
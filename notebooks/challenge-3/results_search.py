@@ -0,0 +1,255 @@
+import re
+import math
+import html
+from bisect import bisect_left
+from dataclasses import dataclass, field as dataclass_field
+from typing import List, Dict, Tuple, Optional
+
+# Words keep inner apostrophes (Istisna'a); clause numbers like 3/1/2 stay one token
+TOKEN_PATTERN = re.compile(r"\d+(?:[./]\d+)+|\w+(?:['’]\w+)*")
+
+# Markdown headings ("## Scope") and bold numbered headings ("**1. Scope**") start a section
+SECTION_HEADING_PATTERN = re.compile(
+    r"^[ \t]*(?:#{1,6}[ \t]+(?P<heading>[^\n]+)|\*\*(?P<bold>\d+\.[^*\n]+)\*\*)", re.MULTILINE
+)
+
+# Searchable fields of each standard and their display names
+SEARCH_FIELDS = {
+    "standard_info": "Standard Information",
+    "enhancements": "Enhancements",
+    "validation_results": "Validation Results",
+}
+
+
+def tokenize(text: str) -> List[Tuple[str, int, int]]:
+    """(lowercased token, start, end) for every token in a text"""
+    return [
+        (match.group(0).lower().replace("’", "'"), match.start(), match.end())
+        for match in TOKEN_PATTERN.finditer(text)
+    ]
+
+
+def split_sections(text: str) -> List[Tuple[str, int, int]]:
+    """(title, start, end) sections of a text, split at its headings"""
+    headings = [
+        ((match.group("heading") or match.group("bold")).strip(" *#:"), match.start())
+        for match in SECTION_HEADING_PATTERN.finditer(text)
+    ]
+    if not headings or headings[0][1] > 0:
+        headings.insert(0, ("Introduction", 0))
+    return [
+        (title, start, headings[i + 1][1] if i + 1 < len(headings) else len(text))
+        for i, (title, start) in enumerate(headings)
+    ]
+
+
+@dataclass
+class Section:
+    standard: str
+    field: str
+    title: str
+    start: int
+    end: int
+    # Token character offsets in the field text, by position
+    spans: List[Tuple[int, int]] = dataclass_field(default_factory=list)
+
+    @property
+    def anchor(self) -> str:
+        """HTML id of the section, stable for a given results file"""
+        return f"{self.standard}-{self.field}-{self.start}".lower()
+
+
+@dataclass
+class SearchHit:
+    standard: str
+    field: str
+    section: str
+    anchor: str
+    score: float
+    # (start, end) offsets of every match in the field text
+    highlights: List[Tuple[int, int]]
+
+
+class ResultsSearchIndex:
+    """Positional inverted index over the enhancement results.
+
+    Each section of a standard's fields is one document. Postings keep token
+    positions, so phrase queries are answered from the index, and every
+    token's character offsets are stored at build time, so hits come with
+    highlight offsets without rescanning the text.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.sections: List[Section] = []
+        self.anchors: Dict[str, Section] = {}
+        self.texts: Dict[Tuple[str, str], str] = {}
+        # term -> {section index: [positions]}
+        self.postings: Dict[str, Dict[int, List[int]]] = {}
+        self.vocabulary: List[str] = []
+        self.avg_length = 0.0
+
+    def build(self, results: Dict[str, Dict[str, str]]) -> "ResultsSearchIndex":
+        for standard, data in results.items():
+            for field_name in SEARCH_FIELDS:
+                text = data.get(field_name) or ""
+                self.texts[(standard, field_name)] = text
+                for title, start, end in split_sections(text):
+                    section_index = len(self.sections)
+                    section = Section(standard, field_name, title, start, end)
+                    for position, (term, token_start, token_end) in enumerate(
+                        tokenize(text[start:end])
+                    ):
+                        section.spans.append((start + token_start, start + token_end))
+                        self.postings.setdefault(term, {}).setdefault(section_index, []).append(position)
+                    self.sections.append(section)
+                    self.anchors[section.anchor] = section
+
+        self.vocabulary = sorted(self.postings)
+        self.avg_length = (
+            sum(len(section.spans) for section in self.sections) / len(self.sections)
+            if self.sections else 0.0
+        )
+        return self
+
+    def expand_prefix(self, prefix: str) -> List[str]:
+        """Indexed terms starting with prefix"""
+        terms = []
+        for i in range(bisect_left(self.vocabulary, prefix), len(self.vocabulary)):
+            if not self.vocabulary[i].startswith(prefix):
+                break
+            terms.append(self.vocabulary[i])
+        return terms
+
+    def _idf(self, document_frequency: int) -> float:
+        n = len(self.sections)
+        return math.log(1 + (n - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    @staticmethod
+    def parse_query(query: str) -> List[Tuple[List[str], bool]]:
+        """Query clauses as (terms, prefix) pairs.
+
+        Words match as prefixes ("istisna" finds "istisna'a"); "quoted text"
+        is an exact phrase. A phrase still being typed (no closing quote)
+        matches its last word as a prefix. A prefix clause of several terms
+        is a phrase whose last term is a prefix.
+        """
+        clauses = []
+        for match in re.finditer(r'"([^"]*)("?)|(\S+)', query):
+            if match.group(1) is not None:
+                terms = [term for term, _, _ in tokenize(match.group(1))]
+                prefix = not match.group(2)
+            else:
+                terms = [term for term, _, _ in tokenize(match.group(3))]
+                prefix = True
+            if terms:
+                clauses.append((terms, prefix))
+        return clauses
+
+    def _term_postings(self, term: str, prefix: bool) -> Dict[int, List[int]]:
+        """Section index -> positions of a term, or of every term with that prefix"""
+        if not prefix:
+            return self.postings.get(term, {})
+        merged: Dict[int, List[int]] = {}
+        for candidate in self.expand_prefix(term):
+            for section_index, positions in self.postings[candidate].items():
+                merged.setdefault(section_index, []).extend(positions)
+        return merged
+
+    def _match_clause(
+        self, terms: List[str], prefix: bool
+    ) -> Dict[int, List[Tuple[int, int]]]:
+        """Section index -> matched (first, last) token positions for one clause"""
+        if len(terms) == 1:
+            return {
+                section_index: [(p, p) for p in positions]
+                for section_index, positions in self._term_postings(terms[0], prefix).items()
+            }
+
+        # Phrase: positions of consecutive terms must follow each other
+        postings = [self.postings.get(term, {}) for term in terms[:-1]]
+        postings.append(self._term_postings(terms[-1], prefix))
+        if not all(postings):
+            return {}
+        matches = {}
+        for section_index in set.intersection(*(set(p) for p in postings)):
+            following = [set(p[section_index]) for p in postings[1:]]
+            starts = [
+                position
+                for position in postings[0][section_index]
+                if all(position + offset + 1 in positions for offset, positions in enumerate(following))
+            ]
+            if starts:
+                matches[section_index] = [(start, start + len(terms) - 1) for start in starts]
+        return matches
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[SearchHit]:
+        """Sections matching every clause of the query, best first"""
+        clauses = self.parse_query(query)
+        if not clauses:
+            return []
+
+        clause_matches = [self._match_clause(terms, prefix) for terms, prefix in clauses]
+        section_indexes = set.intersection(*(set(matches) for matches in clause_matches))
+
+        hits = []
+        for section_index in section_indexes:
+            section = self.sections[section_index]
+            length_norm = 1 - self.b + self.b * len(section.spans) / (self.avg_length or 1)
+            score = 0.0
+            highlights = []
+            for matches in clause_matches:
+                occurrences = matches[section_index]
+                freq = len(occurrences)
+                score += self._idf(len(matches)) * (
+                    freq * (self.k1 + 1) / (freq + self.k1 * length_norm)
+                )
+                highlights.extend(
+                    (section.spans[first][0], section.spans[last][1]) for first, last in occurrences
+                )
+            hits.append(
+                SearchHit(
+                    standard=section.standard,
+                    field=section.field,
+                    section=section.title,
+                    anchor=section.anchor,
+                    score=score,
+                    highlights=sorted(set(highlights)),
+                )
+            )
+
+        hits.sort(key=lambda hit: (-hit.score, hit.standard, hit.field, hit.highlights[0]))
+        return hits[:limit]
+
+    def snippet(self, hit: SearchHit, width: int = 80) -> str:
+        """HTML excerpt around a hit's first match with every match highlighted"""
+        text = self.texts[(hit.standard, hit.field)]
+        first_start, first_end = hit.highlights[0]
+        start = max(0, first_start - width)
+        end = min(len(text), first_end + width)
+        excerpt = _highlight(text, start, end, hit.highlights)
+        return (
+            ("…" if start > 0 else "") + excerpt + ("…" if end < len(text) else "")
+        ).replace("\n", " ")
+
+    def section_html(self, section: Section, highlights: List[Tuple[int, int]] = ()) -> str:
+        """HTML of a whole section with the given matches highlighted"""
+        text = self.texts[(section.standard, section.field)]
+        return _highlight(text, section.start, section.end, highlights)
+
+
+def _highlight(text: str, start: int, end: int, highlights) -> str:
+    """Escaped text[start:end] with the (start, end) matches inside it highlighted"""
+    parts = []
+    cursor = start
+    for match_start, match_end in highlights:
+        if match_start < cursor or match_end > end:
+            continue
+        parts.append(html.escape(text[cursor:match_start]))
+        parts.append(
+            f"<span class='search-highlight'>{html.escape(text[match_start:match_end])}</span>"
+        )
+        cursor = match_end
+    parts.append(html.escape(text[cursor:end]))
+    return "".join(parts)
@@ -0,0 +1,95 @@
+import os
+import json
+from typing import List, Dict, Any, Optional, Literal
+
+from pydantic import BaseModel, Field, ValidationError
+
+# Columnar-friendly validation results, one flat row per validated enhancement
+VALIDATION_RESULTS_NAME = "fas_validation_results.jsonl"
+
+VERDICTS = ("Approved", "Approved with Modifications", "Rejected")
+
+
+class EnhancementValidation(BaseModel):
+    """Validation Agent verdict on one proposed enhancement"""
+
+    enhancement: str = Field(description="Title of the proposed enhancement, as given by the Enhancement Agent")
+    verdict: Literal["Approved", "Approved with Modifications", "Rejected"] = Field(
+        description="Approved, Approved with Modifications, or Rejected"
+    )
+    rationale: str = Field(
+        description="Justification with reference to Shariah principles or AAOIFI requirements"
+    )
+    referenced_clause: Optional[str] = Field(
+        default=None,
+        description="Standard and clause the decision relies on, e.g. 'FAS 10, para 12' or 'SS 11, 3/1/2'",
+    )
+    modifications: Optional[str] = Field(
+        default=None,
+        description="Required modifications, for 'Approved with Modifications' only",
+    )
+
+
+class ValidationReport(BaseModel):
+    """Validation Agent output for all enhancements proposed for a standard"""
+
+    validations: List[EnhancementValidation] = Field(
+        description="One entry per proposed enhancement, in the order they were proposed"
+    )
+    summary: str = Field(description="Which enhancements should be adopted, modified, or rejected")
+
+
+def validation_to_markdown(report: ValidationReport) -> str:
+    """Readable report grouped by verdict, kept as the results file's validation_results text"""
+    lines = []
+    for verdict in VERDICTS:
+        items = [item for item in report.validations if item.verdict == verdict]
+        if not items:
+            continue
+        lines.append(f"**{verdict}:**\n")
+        for item in items:
+            lines.append(f"* **{item.enhancement}**: {item.rationale}")
+            if item.modifications:
+                lines.append(f"  * Modifications: {item.modifications}")
+            if item.referenced_clause:
+                lines.append(f"  * Reference: {item.referenced_clause}")
+        lines.append("")
+    lines.append(f"**Summary:** {report.summary}")
+    return "\n".join(lines)
+
+
+def validation_rows(standard_key: str, report: ValidationReport) -> List[Dict[str, Any]]:
+    """Flat rows (one per enhancement) for the columnar results file"""
+    return [
+        {"standard": standard_key, "position": position, **item.model_dump()}
+        for position, item in enumerate(report.validations, 1)
+    ]
+
+
+def save_validation_rows(rows: List[Dict[str, Any]], path: str):
+    """Write validation rows as JSON lines atomically"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, path)
+
+
+def load_validation_rows(path: str) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+    """Validation rows grouped by standard key and then by verdict.
+
+    Rows that do not match the schema are skipped.
+    """
+    grouped: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            try:
+                item = EnhancementValidation.model_validate(row)
+            except ValidationError:
+                continue
+            by_verdict = grouped.setdefault(row.get("standard", ""), {verdict: [] for verdict in VERDICTS})
+            by_verdict[item.verdict].append({**row, **item.model_dump()})
+    return grouped